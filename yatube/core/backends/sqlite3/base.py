@@ -0,0 +1,20 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite с выбором режима транзакций, как в новых версиях Django.
+
+    ``OPTIONS['transaction_mode'] = 'IMMEDIATE'`` берёт блокировку записи
+    в начале ``atomic``. С обычным BEGIN транзакция, которая сначала
+    читает, а потом пишет, при занятой базе сразу падает с
+    «database is locked», не дожидаясь ``busy_timeout``.
+    """
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        kwargs.pop('transaction_mode', None)
+        return kwargs
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        self.cursor().execute(f'BEGIN {mode}' if mode else 'BEGIN')
@@ -0,0 +1,36 @@
+import math
+import time
+
+
+def measure(func, repeat):
+    """Запускает ``func`` ``repeat`` раз и возвращает время в миллисекундах."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def percentile(timings, percent):
+    ordered = sorted(timings)
+    if not ordered:
+        return 0.0
+    rank = max(math.ceil(percent / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+def summary(timings):
+    return {
+        'p50': percentile(timings, 50),
+        'p95': percentile(timings, 95),
+        'p99': percentile(timings, 99),
+        'mean': sum(timings) / len(timings) if timings else 0.0,
+    }
+
+
+def format_row(label, timings):
+    stats = summary(timings)
+    return '{:<28} p50={p50:9.3f}ms p95={p95:9.3f}ms p99={p99:9.3f}ms'.format(
+        label, **stats
+    )
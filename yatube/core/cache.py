@@ -0,0 +1,215 @@
+import hashlib
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+
+from . import replicas
+
+VERSION_KEY = 'pagecache:version:{}'
+PAGE_KEY = 'pagecache:page:{}'
+
+
+def _new_version():
+    # Случайная версия, а не счётчик: после очистки кеша или перезапуска
+    # нельзя повторить номер, под которым уже лежала старая страница.
+    # Время смены версии нужно, чтобы узнать, догнала ли её реплика.
+    return f'{time.time():.3f}-{uuid.uuid4().hex}'
+
+
+def _maybe_stale(versions):
+    """View читает с реплики, а версии сменились недавно: реплика могла
+    ещё не получить изменения, из-за которых они сменились."""
+    if replicas.current() is None:
+        return False
+    deadline = time.time() - settings.REPLICA_MAX_LAG
+    for version in versions:
+        try:
+            if float(version.partition('-')[0]) > deadline:
+                return True
+        except ValueError:
+            continue
+    return False
+
+
+def _version_key(namespace):
+    return VERSION_KEY.format(hashlib.md5(namespace.encode()).hexdigest())
+
+
+def get_versions(namespaces):
+    keys = [_version_key(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            initial = _new_version()
+            cache.add(key, initial, None)
+            versions[key] = cache.get(key, initial)
+    return [versions[key] for key in keys]
+
+
+def _set_versions(namespaces):
+    cache.set_many(
+        {_version_key(namespace): _new_version() for namespace in namespaces},
+        None,
+    )
+
+
+def bump(*namespaces):
+    """Делает недействительными все страницы, закешированные в namespaces.
+
+    Внутри транзакции версии меняются ещё раз после коммита: запрос,
+    прочитавший старые строки до коммита, мог успеть положить страницу
+    под уже новую версию.
+    """
+    _set_versions(namespaces)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _set_versions(namespaces))
+
+
+def _digest(request, namespaces, versions):
+    user_id = request.user.pk if request.user.is_authenticated else 0
+    raw = '|'.join([
+        request.get_full_path(),
+        str(user_id),
+        ','.join(namespaces),
+        ','.join(versions),
+    ])
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def page_key(request, namespaces, versions):
+    return PAGE_KEY.format(_digest(request, namespaces, versions))
+
+
+def page_etag(request, namespaces, versions):
+    """ETag страницы, который считается без единого запроса к базе."""
+    return '"{}"'.format(_digest(request, namespaces, versions))
+
+
+def _not_modified(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    # Сравнение для If-None-Match слабое: W/ у тега не учитывается.
+    etags = [tag[2:] if tag.startswith('W/') else tag
+             for tag in parse_etags(header)]
+    return etag in etags or '*' in etags
+
+
+def _add_validators(request, response, etag):
+    response['ETag'] = etag
+    # no-cache: клиент и прокси хранят страницу, но перед показом
+    # сверяются с сервером, и тот отвечает 304, если версии не менялись.
+    patch_cache_control(
+        response, no_cache=True, private=request.user.is_authenticated,
+    )
+    return response
+
+
+def _cacheable(request, response):
+    return (
+        request.method == 'GET'
+        and response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+    )
+
+
+def _wait_for(key):
+    deadline = time.monotonic() + settings.PAGE_CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        response = cache.get(key)
+        if response is not None:
+            return response
+    return None
+
+
+def _render_once(key, etag, timeout, view, request, *args, **kwargs):
+    lock = key + ':lock'
+    locked = cache.add(lock, 1, settings.PAGE_CACHE_LOCK_TIMEOUT)
+    if not locked:
+        response = _wait_for(key)
+        if response is not None:
+            return response
+    try:
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200 and etag:
+            _add_validators(request, response, etag)
+        if _cacheable(request, response):
+            cache.set(key, response, timeout or settings.PAGE_CACHE_TIMEOUT)
+    finally:
+        if locked:
+            cache.delete(lock)
+    return response
+
+
+def cache_page_versioned(namespaces, timeout=None):
+    """Кеширует страницу под версиями пространств имён ``namespaces``.
+
+    ``namespaces`` - функция от аргументов view, возвращающая список имён.
+    Страница живёт ``timeout`` секунд или до вызова ``bump`` для любого из
+    её пространств. Промах кеша перестраивает только один воркер, остальные
+    ждут его результата не дольше ``PAGE_CACHE_LOCK_WAIT`` секунд. Те же
+    версии дают ETag, так что повторный запрос клиента получает 304.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            names = namespaces(request, *args, **kwargs)
+            versions = get_versions(names)
+            etag = page_etag(request, names, versions)
+            if _not_modified(request, etag):
+                return _add_validators(
+                    request, HttpResponseNotModified(), etag
+                )
+            key = page_key(request, names, versions)
+            response = cache.get(key)
+            if response is not None:
+                return response
+            if _maybe_stale(versions):
+                # Страница с отстающей реплики живёт не дольше её отставания
+                # и без ETag, иначе клиент закрепил бы её через 304.
+                return _render_once(
+                    key, None, settings.REPLICA_MAX_LAG,
+                    view, request, *args, **kwargs
+                )
+            return _render_once(
+                key, etag, timeout, view, request, *args, **kwargs
+            )
+        return wrapper
+    return decorator
+
+
+def etag_versioned(namespaces):
+    """Отвечает 304 Not Modified, пока не сменились версии ``namespaces``.
+
+    ``namespaces`` - функция от аргументов view, как у
+    ``cache_page_versioned``. Страница при этом не кешируется.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            names = namespaces(request, *args, **kwargs)
+            versions = get_versions(names)
+            etag = page_etag(request, names, versions)
+            if _not_modified(request, etag):
+                return _add_validators(
+                    request, HttpResponseNotModified(), etag
+                )
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not _maybe_stale(versions):
+                _add_validators(request, response, etag)
+            return response
+        return wrapper
+    return decorator
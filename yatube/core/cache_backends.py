@@ -0,0 +1,155 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+_stores = {}
+_stores_lock = threading.Lock()
+_MISSING = object()
+
+
+class _LocalStore:
+    """Ограниченный LRU процесса, общий для всех его потоков."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires, pickled = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return _MISSING
+            self.entries.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def set(self, key, value, timeout):
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.entries[key] = (time.monotonic() + timeout, pickled)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class TieredCache(BaseCache):
+    """Маленький LRU процесса (L1) перед общим для процессов кешем (L2).
+
+    ``LOCATION`` - имя кеша L2 из ``CACHES``. В L1 попадают только ключи с
+    префиксами из ``LOCAL_PREFIXES``: это должны быть ключи, значение под
+    которыми не меняется (страницы и карточки с версией в ключе). Всё
+    остальное, в первую очередь версии, читается из L2, поэтому ``bump``
+    в одном процессе сразу виден остальным. L1 держит не больше
+    ``LOCAL_MAX_ENTRIES`` значений и не дольше ``LOCAL_TIMEOUT`` секунд.
+
+    Префикс и версия ключей берутся из настроек L2.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = location
+        self._local_prefixes = tuple(options.get('LOCAL_PREFIXES', ()))
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 60)
+        with _stores_lock:
+            self._local = _stores.setdefault(
+                location, _LocalStore(options.get('LOCAL_MAX_ENTRIES', 500))
+            )
+
+    @property
+    def _shared(self):
+        return caches[self._shared_alias]
+
+    def _is_local(self, key):
+        return key.startswith(self._local_prefixes)
+
+    def _remember(self, key, version, value, timeout):
+        if not self._is_local(key):
+            return
+        if timeout is DEFAULT_TIMEOUT or timeout is None:
+            timeout = self._local_timeout
+        self._local.set(
+            (key, version), value, min(timeout, self._local_timeout)
+        )
+
+    def get(self, key, default=None, version=None):
+        if self._is_local(key):
+            value = self._local.get((key, version))
+            if value is not _MISSING:
+                return value
+        value = self._shared.get(key, _MISSING, version)
+        if value is _MISSING:
+            return default
+        self._remember(key, version, value, None)
+        return value
+
+    def get_many(self, keys, version=None):
+        found, missing = {}, []
+        for key in keys:
+            value = _MISSING
+            if self._is_local(key):
+                value = self._local.get((key, version))
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            shared = self._shared.get_many(missing, version)
+            for key, value in shared.items():
+                self._remember(key, version, value, None)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._shared.set(key, value, timeout, version)
+        self._remember(key, version, value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self._shared.set_many(data, timeout, version) or []
+        for key, value in data.items():
+            if key not in failed:
+                self._remember(key, version, value, timeout)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self._shared.add(key, value, timeout, version)
+        if added:
+            self._remember(key, version, value, timeout)
+        return added
+
+    def delete(self, key, version=None):
+        self._local.delete((key, version))
+        return self._shared.delete(key, version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._shared.touch(key, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        self._local.delete((key, version))
+        return self._shared.incr(key, delta, version)
+
+    def has_key(self, key, version=None):
+        return self._shared.has_key(key, version)
+
+    def clear(self):
+        self._local.clear()
+        self._shared.clear()
+
+    def close(self, **kwargs):
+        self._shared.close(**kwargs)
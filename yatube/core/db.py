@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.db import connections
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    """Настраивает каждое новое соединение SQLite по ``SQLITE_PRAGMAS``."""
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def check_connections(**kwargs):
+    """Закрывает постоянные соединения, которые перестали отвечать.
+
+    Django 2.2 переиспользует соединение с ``CONN_MAX_AGE`` не проверяя
+    его, и первый запрос после разрыва связи с базой падает.
+    """
+    for connection in connections.all():
+        if connection.connection is None:
+            continue
+        if not connection.is_usable():
+            connection.close()
@@ -0,0 +1,173 @@
+import json
+import logging
+import time
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .bench import summary
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+def task(func):
+    """Помечает функцию как фоновую задачу, которую можно поставить в
+    очередь через ``enqueue``. Аргументы должны сериализоваться в JSON."""
+    func.job_name = f'{func.__module__}.{func.__qualname__}'
+    return func
+
+
+def enqueue(func, *args, key=None, delay=0, max_attempts=None):
+    """Ставит задачу в очередь в текущей транзакции.
+
+    Строка задачи коммитится вместе с данными, ради которых она нужна,
+    поэтому воркер не увидит задачу раньше них и не потеряет её после.
+    При ``JOBS_EAGER`` задача выполняется сразу, кроме отложенных: их
+    смысл в паузе, поэтому они ждут в очереди воркер или свою команду.
+    """
+    if settings.JOBS_EAGER and not delay:
+        try:
+            # Точка сохранения: ошибка базы в задаче не должна ломать
+            # транзакцию запроса, в котором задачу поставили.
+            with transaction.atomic():
+                func(*args)
+        except Exception:
+            logger.exception('Задача %s упала', func.job_name)
+        return
+    Job.objects.bulk_create([Job(
+        name=func.job_name,
+        args=json.dumps(args),
+        key=key,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )], ignore_conflicts=key is not None)
+
+
+def claim(limit):
+    """Забирает до ``limit`` готовых к запуску задач для этого воркера."""
+    token = uuid.uuid4().hex
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Job.objects.filter(status=Job.QUEUED, run_at__lte=now)
+            .order_by('run_at', 'pk')
+            .values_list('pk', flat=True)[:limit]
+        )
+        # Повторная проверка статуса в UPDATE не даёт двум воркерам взять
+        # одну задачу.
+        Job.objects.filter(pk__in=ids, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            claim=token,
+            started=now,
+            attempts=F('attempts') + 1,
+        )
+    return list(Job.objects.filter(claim=token, status=Job.RUNNING))
+
+
+def backoff(attempts):
+    return min(
+        settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.JOBS_MAX_RETRY_DELAY,
+    )
+
+
+def run(job):
+    """Выполняет захваченную задачу и записывает результат."""
+    started = time.perf_counter()
+    try:
+        func = import_string(job.name)
+        if not hasattr(func, 'job_name'):
+            raise ValueError(f'{job.name} не помечена как задача')
+        with transaction.atomic():
+            func(*json.loads(job.args))
+    except Exception:
+        job.error = traceback.format_exc()[-4000:]
+        if job.attempts < job.max_attempts:
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + timedelta(
+                seconds=backoff(job.attempts)
+            )
+            logger.warning('Задача %s упала, повтор в %s', job, job.run_at)
+        else:
+            job.status = Job.FAILED
+            logger.error('Задача %s не выполнена: %s', job, job.error)
+    else:
+        job.status = Job.DONE
+        job.error = ''
+    job.finished = timezone.now()
+    job.duration_ms = (time.perf_counter() - started) * 1000
+    fields = ['status', 'error', 'run_at', 'finished', 'duration_ms']
+    try:
+        with transaction.atomic():
+            job.save(update_fields=fields)
+    except IntegrityError:
+        # Пока задача выполнялась, в очередь встала такая же: повтор
+        # сделает она.
+        job.status = Job.FAILED
+        job.save(update_fields=fields)
+    return job
+
+
+def requeue_stuck():
+    """Возвращает в очередь задачи воркеров, которые умерли на середине."""
+    deadline = timezone.now() - timedelta(seconds=settings.JOBS_TIMEOUT)
+    stuck = Job.objects.filter(status=Job.RUNNING, started__lt=deadline)
+    for job in stuck:
+        job.error = 'Воркер не закончил задачу за JOBS_TIMEOUT'
+        job.status = Job.QUEUED
+        if job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+        job.claim = ''
+        try:
+            with transaction.atomic():
+                job.save(update_fields=['status', 'claim', 'error'])
+        except IntegrityError:
+            job.status = Job.FAILED
+            job.save(update_fields=['status', 'claim', 'error'])
+    return len(stuck)
+
+
+def purge(older_than):
+    """Удаляет выполненные задачи старше ``older_than`` секунд."""
+    deadline = timezone.now() - timedelta(seconds=older_than)
+    return Job.objects.filter(
+        status=Job.DONE, finished__lt=deadline
+    ).delete()[0]
+
+
+def stats(recent=10000):
+    """Метрики по каждой задаче: статусы, повторы, длительность и
+    ожидание в очереди последних ``recent`` выполненных задач."""
+    rows = {}
+    for name, status, count in (
+        Job.objects.values_list('name', 'status')
+        .annotate(count=Count('pk')).order_by()
+    ):
+        rows.setdefault(name, {'name': name, 'durations': [], 'waits': [],
+                               'retries': 0})[status] = count
+    finished = (
+        Job.objects.filter(status__in=[Job.DONE, Job.FAILED])
+        .order_by('-finished')
+        .values_list('name', 'attempts', 'duration_ms', 'created',
+                     'started')[:recent]
+    )
+    for name, attempts, duration, created, started in finished:
+        row = rows[name]
+        row['retries'] += attempts - 1
+        if duration is not None:
+            row['durations'].append(duration)
+        if started is not None:
+            row['waits'].append((started - created).total_seconds() * 1000)
+    for row in rows.values():
+        row['duration'] = summary(row.pop('durations'))
+        row['wait'] = summary(row.pop('waits'))
+        for status, _ in Job.STATUSES:
+            row.setdefault(status, 0)
+    return sorted(rows.values(), key=lambda row: row['name'])
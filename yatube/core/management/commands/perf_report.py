@@ -0,0 +1,40 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import profiling
+
+
+class Command(BaseCommand):
+    help = (
+        'Сводка профилирования по url из буферов, которые процессы '
+        'сервера сбрасывают в PROFILING_DUMP_DIR'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=settings.PROFILING_DUMP_DIR)
+        parser.add_argument(
+            '--json', action='store_true', help='Вывести сводку в JSON',
+        )
+
+    def handle(self, *args, **options):
+        if not options['dir']:
+            raise CommandError('PROFILING_DUMP_DIR не задан')
+        rows = profiling.report(profiling.load(options['dir']))
+        if options['json']:
+            self.stdout.write(json.dumps(rows, indent=2))
+            return
+        if not rows:
+            self.stdout.write('Замеров нет')
+            return
+        for row in rows:
+            ratio = row['cache_hit_ratio']
+            self.stdout.write(
+                '{view:<24} n={requests:<5} p50={p50:8.1f}ms '
+                'p95={p95:8.1f}ms p99={p99:8.1f}ms sql={queries:5.1f} '
+                '({sql_ms:6.1f}ms, dup {duplicates:4.1f}) '
+                'tpl={template_ms:6.1f}ms cache={ratio}'.format(
+                    ratio='-' if ratio is None else f'{ratio:.0%}', **row
+                )
+            )
@@ -0,0 +1,92 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.template import Engine, RequestContext
+from django.test import RequestFactory
+
+from core import templates
+from core.bench import format_row, measure
+from posts.models import Post
+
+CACHED_LOADER = 'django.template.loaders.cached.Loader'
+
+
+class Command(BaseCommand):
+    help = (
+        'Разбирает все шаблоны проекта и приложений при выкладке и падает, '
+        'если какой-то не разбирается. С --bench сравнивает загрузку '
+        'шаблонов без кеша и из cached.Loader'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bench', type=int, default=0, metavar='N',
+            help='Сколько раз загрузить каждый шаблон в замере',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        names = templates.template_names()
+        errors = templates.precompile(names)
+        for name, error in errors.items():
+            self.stderr.write(f'{name}: {error}')
+        self.stdout.write(
+            f'Шаблонов: {len(names)}, с ошибками: {len(errors)}, '
+            f'{(time.perf_counter() - started) * 1000:.0f} мс'
+        )
+        if options['bench']:
+            self.bench(names, errors, options['bench'])
+        if errors:
+            raise CommandError('Есть шаблоны с ошибками')
+
+    def bench(self, names, errors, repeat):
+        engine = self.cached_engine()
+        names = [name for name in names if name not in errors]
+        self.compare(
+            f'Загрузка {len(names)} шаблонов:', engine, repeat,
+            lambda: templates.precompile(names, engine),
+        )
+        post = Post.objects.with_related().first()
+        if post is None:
+            return
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        context = RequestContext(request, {'post': post})
+        self.compare(
+            'Отрисовка posts/post_detail.html:', engine, repeat,
+            lambda: engine.get_template(
+                'posts/post_detail.html'
+            ).render(context),
+        )
+
+    def compare(self, title, engine, repeat, func):
+        cold, warm = [], []
+        for _ in range(repeat):
+            templates.reset(engine)
+            cold.extend(measure(func, 1))
+            warm.extend(measure(func, 1))
+        self.stdout.write(title)
+        self.stdout.write(format_row('без кеша (первый запрос)', cold))
+        self.stdout.write(format_row('cached.Loader', warm))
+
+    def cached_engine(self):
+        """Движок с настройками проекта, но всегда с cached.Loader."""
+        engine = templates._engine()
+        loaders = engine.loaders
+        if not any(
+            isinstance(loader, tuple) and loader[0] == CACHED_LOADER
+            for loader in loaders
+        ):
+            loaders = [(CACHED_LOADER, loaders)]
+        return Engine(
+            dirs=engine.dirs,
+            context_processors=engine.context_processors,
+            debug=engine.debug,
+            loaders=loaders,
+            string_if_invalid=engine.string_if_invalid,
+            file_charset=engine.file_charset,
+            libraries=engine.libraries,
+            builtins=engine.builtins[len(Engine.default_builtins):],
+            autoescape=engine.autoescape,
+        )
@@ -0,0 +1,94 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import jobs, workers
+from core.models import Job
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает воркеры очереди фоновых задач. Каждый процесс забирает '
+        'готовые задачи пачками, упавшие повторяет с растущей паузой'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=2, help='Число процессов',
+        )
+        parser.add_argument(
+            '--batch', type=int, default=10,
+            help='Сколько задач процесс забирает за раз',
+        )
+        parser.add_argument(
+            '--poll', type=float, default=1,
+            help='Пауза в секундах, когда очередь пуста',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить всё, что готово, в этом процессе и выйти',
+        )
+        parser.add_argument(
+            '--stats', action='store_true', help='Показать метрики и выйти',
+        )
+        parser.add_argument(
+            '--purge', type=int, metavar='SECONDS',
+            help='Удалить выполненные задачи старше SECONDS секунд и выйти',
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.print_stats()
+            return
+        if options['purge'] is not None:
+            deleted = jobs.purge(options['purge'])
+            self.stdout.write(f'Удалено задач: {deleted}')
+            return
+        if options['once']:
+            done = workers.work(options['batch'], options['poll'], once=True)
+            self.stdout.write(f'Выполнено задач: {done}')
+            return
+        # Дочерние процессы не должны делить соединения с родителем.
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(
+                target=workers.worker,
+                args=(options['batch'], options['poll']),
+                name=f'jobs-{number}',
+            )
+            for number in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(
+            f'Запущено воркеров: {len(processes)}, Ctrl+C для остановки'
+        )
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
+
+    def print_stats(self):
+        rows = jobs.stats()
+        if not rows:
+            self.stdout.write('Задач нет')
+            return
+        self.stdout.write(
+            f'{"задача":<40} {"очередь":>7} {"идёт":>5} {"готово":>7} '
+            f'{"ошибок":>6} {"повторов":>8} {"p50, мс":>9} {"p95, мс":>9} '
+            f'{"ожид. p95":>10}'
+        )
+        for row in rows:
+            self.stdout.write(
+                f'{row["name"]:<40} {row[Job.QUEUED]:>7} '
+                f'{row[Job.RUNNING]:>5} {row[Job.DONE]:>7} '
+                f'{row[Job.FAILED]:>6} {row["retries"]:>8} '
+                f'{row["duration"]["p50"]:>9.1f} '
+                f'{row["duration"]["p95"]:>9.1f} '
+                f'{row["wait"]["p95"]:>10.1f}'
+            )
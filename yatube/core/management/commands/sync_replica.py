@@ -0,0 +1,53 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Изображает отстающую реплику SQLite для локальной проверки: '
+        'раз в --lag секунд копирует основную базу в файлы реплик'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lag', type=float, default=5,
+            help='Секунд между копированиями, то есть отставание реплики',
+        )
+        parser.add_argument(
+            '--once', action='store_true', help='Скопировать один раз',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError(
+                'Реплики не настроены, запустите с DB_REPLICA=1'
+            )
+        databases = [settings.DATABASES['default']] + [
+            settings.DATABASES[alias] for alias in settings.DATABASE_REPLICAS
+        ]
+        if any(not database['ENGINE'].endswith('sqlite3')
+               for database in databases):
+            raise CommandError('Копировать можно только базы SQLite')
+        primary, replicas = databases[0]['NAME'], databases[1:]
+        while True:
+            started = time.perf_counter()
+            source = sqlite3.connect(primary)
+            try:
+                for replica in replicas:
+                    target = sqlite3.connect(replica['NAME'])
+                    try:
+                        source.backup(target)
+                    finally:
+                        target.close()
+            finally:
+                source.close()
+            self.stdout.write(
+                f'Реплики обновлены за '
+                f'{(time.perf_counter() - started) * 1000:.0f} мс'
+            )
+            if options['once']:
+                return
+            time.sleep(options['lag'])
@@ -0,0 +1,99 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import profiling, replicas
+from .queries import QueryCounter
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryBudgetMiddleware:
+    """Следит, чтобы view не выходили за бюджет SQL-запросов.
+
+    Бюджеты задаются в ``QUERY_BUDGETS`` по имени url. При
+    ``QUERY_BUDGET_STRICT`` превышение роняет запрос, иначе попадает в лог.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryCounter() as counter:
+            response = self.get_response(request)
+        match = request.resolver_match
+        budget = match and settings.QUERY_BUDGETS.get(match.view_name)
+        if budget is not None and counter.count > budget:
+            message = (
+                f'{match.view_name}: {counter.count} SQL-запросов '
+                f'при бюджете {budget} ({request.get_full_path()})'
+            )
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+class ProfilingMiddleware:
+    """Замеряет SQL, шаблоны и кеш каждого запроса.
+
+    Включается настройкой ``PROFILING_ENABLED``. Результаты уходят в
+    заголовок ``Server-Timing`` и в кольцевой буфер по имени url, который
+    показывают ``core:perf_report`` и ``manage.py perf_report``.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        profiling.install()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with profiling.RequestProfile() as profile:
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - started) * 1000
+        response['Server-Timing'] = profile.server_timing(total_ms)
+        match = request.resolver_match
+        if match is not None:
+            profiling.record(match.view_name, profile.sample(total_ms))
+        return response
+
+
+class ReplicaPinMiddleware:
+    """Read-your-writes для реплик.
+
+    После запроса с записью в основную базу пользователь получает cookie
+    ``REPLICA_PIN_COOKIE`` и ``REPLICA_PIN_SECONDS`` секунд читает только
+    из неё, чтобы видеть свои изменения, пока реплика их догоняет.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            until = float(request.COOKIES.get(settings.REPLICA_PIN_COOKIE, 0))
+        except ValueError:
+            until = 0
+        replicas.begin(pin=until > time.time())
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = replicas.end()
+        if wrote:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                f'{time.time() + settings.REPLICA_PIN_SECONDS:.3f}',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+            )
+        return response
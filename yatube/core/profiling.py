@@ -0,0 +1,212 @@
+import glob
+import itertools
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.base import Template
+
+from .bench import summary
+
+_local = threading.local()
+_lock = threading.Lock()
+_buffers = defaultdict(lambda: deque(maxlen=settings.PROFILING_BUFFER_SIZE))
+_installed = False
+_recorded = itertools.count(1)
+_MISS = object()
+
+
+class RequestProfile:
+    """Что происходило за время одного запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_ms = 0.0
+        self.statements = Counter()
+        self.template_ms = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._stack = ExitStack()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_ms += (time.perf_counter() - started) * 1000
+            self.queries += 1
+            self.statements[(sql, repr(params))] += 1
+
+    def __enter__(self):
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        _local.profile = self
+        return self
+
+    def __exit__(self, *exc_info):
+        _local.profile = None
+        return self._stack.__exit__(*exc_info)
+
+    @property
+    def duplicates(self):
+        """Сколько запросов повторили уже выполненный с теми же параметрами."""
+        return sum(count - 1 for count in self.statements.values())
+
+    def server_timing(self, total_ms):
+        return ', '.join([
+            f'sql;dur={self.sql_ms:.1f};desc="{self.queries} queries, '
+            f'{self.duplicates} duplicates"',
+            f'tpl;dur={self.template_ms:.1f}',
+            f'cache;desc="{self.cache_hits} hits, '
+            f'{self.cache_misses} misses"',
+            f'total;dur={total_ms:.1f}',
+        ])
+
+    def sample(self, total_ms):
+        return {
+            'total_ms': total_ms,
+            'queries': self.queries,
+            'sql_ms': self.sql_ms,
+            'duplicates': self.duplicates,
+            'template_ms': self.template_ms,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+
+def current():
+    return getattr(_local, 'profile', None)
+
+
+def _timed_render(render):
+    def wrapper(self, context):
+        profile = current()
+        if profile is None:
+            return render(self, context)
+        # Вложенные шаблоны (include, extends) уже входят во время внешнего.
+        profile.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            profile.template_depth -= 1
+            if not profile.template_depth:
+                profile.template_ms += (time.perf_counter() - started) * 1000
+    return wrapper
+
+
+def _counted_get(get):
+    def wrapper(self, key, default=None, version=None):
+        value = get(self, key, _MISS, version)
+        profile = current()
+        if profile is not None:
+            if value is _MISS:
+                profile.cache_misses += 1
+            else:
+                profile.cache_hits += 1
+        return default if value is _MISS else value
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    def wrapper(self, keys, version=None):
+        keys = list(keys)
+        profile = current()
+        if profile is None:
+            return get_many(self, keys, version)
+        # Базовый get_many ходит через get: его счёт заменяется своим.
+        hits, misses = profile.cache_hits, profile.cache_misses
+        found = get_many(self, keys, version)
+        profile.cache_hits = hits + len(found)
+        profile.cache_misses = misses + len(keys) - len(found)
+        return found
+    return wrapper
+
+
+def install():
+    """Подключает замер шаблонов и кеша. Вне профилируемых запросов
+    обёртки сразу передают вызов дальше."""
+    global _installed
+    with _lock:
+        if _installed:
+            return
+        Template.render = _timed_render(Template.render)
+        # Только кеш по умолчанию: многоуровневый кеш сам обращается к
+        # нижнему уровню, и обращения посчитались бы дважды.
+        backend = type(caches['default'])
+        backend.get = _counted_get(backend.get)
+        backend.get_many = _counted_get_many(backend.get_many)
+        _installed = True
+
+
+def record(view_name, sample):
+    with _lock:
+        _buffers[view_name].append(sample)
+        # Счётчик запросов процесса, а не длина буферов: заполненные
+        # буферы перестают расти.
+        number = next(_recorded)
+    every = settings.PROFILING_DUMP_EVERY
+    if settings.PROFILING_DUMP_DIR and every and number % every == 0:
+        dump(settings.PROFILING_DUMP_DIR)
+
+
+def samples():
+    with _lock:
+        return {name: list(buffer) for name, buffer in _buffers.items()}
+
+
+def reset():
+    with _lock:
+        _buffers.clear()
+
+
+def dump(directory):
+    """Сохраняет буфер процесса, чтобы его увидел ``perf_report``."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'perf-{os.getpid()}.json')
+    with open(path + '.tmp', 'w') as dumped:
+        json.dump(samples(), dumped)
+    os.replace(path + '.tmp', path)
+
+
+def load(directory):
+    merged = defaultdict(list)
+    for path in glob.glob(os.path.join(directory, 'perf-*.json')):
+        with open(path) as dumped:
+            for name, rows in json.load(dumped).items():
+                merged[name].extend(rows)
+    return dict(merged)
+
+
+def report(collected=None):
+    """Сводка по каждому имени url: перцентили и средние по запросам."""
+    collected = samples() if collected is None else collected
+    rows = []
+    for name, rows_of_view in sorted(collected.items()):
+        if not rows_of_view:
+            continue
+        count = len(rows_of_view)
+
+        def mean(field):
+            return sum(row[field] for row in rows_of_view) / count
+
+        hits = sum(row['cache_hits'] for row in rows_of_view)
+        lookups = hits + sum(row['cache_misses'] for row in rows_of_view)
+        rows.append(dict(
+            summary([row['total_ms'] for row in rows_of_view]),
+            view=name,
+            requests=count,
+            queries=mean('queries'),
+            sql_ms=mean('sql_ms'),
+            duplicates=mean('duplicates'),
+            template_ms=mean('template_ms'),
+            cache_hit_ratio=hits / lookups if lookups else None,
+        ))
+    return rows
@@ -0,0 +1,23 @@
+from contextlib import ExitStack
+
+from django.db import connections
+
+
+class QueryCounter:
+    """Считает SQL-запросы ко всем базам внутри блока ``with``."""
+
+    def __init__(self):
+        self.count = 0
+        self._stack = ExitStack()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._stack.__exit__(*exc_info)
@@ -0,0 +1,75 @@
+import random
+import threading
+from functools import wraps
+
+from django.conf import settings
+
+_state = threading.local()
+
+
+def current():
+    """Реплика, с которой сейчас читает view, или None."""
+    return getattr(_state, 'replica', None)
+
+
+def pinned():
+    return getattr(_state, 'pinned', False) or getattr(_state, 'wrote', False)
+
+
+def begin(pin=False):
+    _state.pinned = pin
+    _state.wrote = False
+
+
+def end():
+    """Возвращает True, если за запрос что-то писалось в основную базу."""
+    wrote = getattr(_state, 'wrote', False)
+    _state.pinned = _state.wrote = False
+    return wrote
+
+
+def read_from_replica(view):
+    """Запросы view на чтение уходят на одну из ``DATABASE_REPLICAS``.
+
+    Пользователь, который недавно писал, и запрос, в котором уже была
+    запись, читают из основной базы.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not settings.DATABASE_REPLICAS or pinned():
+            return view(request, *args, **kwargs)
+        # Сессия и пользователь читаются из основной базы: только что
+        # созданной сессии на отстающей реплике ещё нет.
+        if hasattr(request, 'user'):
+            request.user.is_authenticated
+        _state.replica = random.choice(settings.DATABASE_REPLICAS)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.replica = None
+    return wrapper
+
+
+class ReplicaRouter:
+    """Чтение внутри ``read_from_replica`` идёт на реплику, остальное -
+    в основную базу. Любая запись закрепляет запрос за основной базой."""
+
+    def db_for_read(self, model, **hints):
+        if pinned():
+            return None
+        return current()
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
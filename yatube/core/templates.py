@@ -0,0 +1,76 @@
+import logging
+import os
+import time
+
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.library import InvalidTemplateLibrary
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = ('.html', '.txt')
+
+
+def _engine():
+    return engines['django'].engine
+
+
+def _directories(loaders):
+    for loader in loaders:
+        if hasattr(loader, 'loaders'):
+            yield from _directories(loader.loaders)
+        else:
+            yield from loader.get_dirs()
+
+
+def template_names(engine=None):
+    """Имена всех шаблонов, которые видят загрузчики движка."""
+    engine = engine or _engine()
+    names = set()
+    for directory in _directories(engine.template_loaders):
+        directory = str(directory)
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith(EXTENSIONS):
+                    path = os.path.join(root, filename)
+                    names.add(os.path.relpath(path, directory).replace(
+                        os.sep, '/'
+                    ))
+    return sorted(names)
+
+
+def precompile(names=None, engine=None):
+    """Разбирает шаблоны и возвращает ``{имя: ошибка}`` для сломанных.
+
+    Сломанным считается и шаблон, который пропал с диска или подключает
+    неимпортируемую библиотеку тегов: остальные всё равно разбираются.
+    С cached.Loader разобранные шаблоны остаются в памяти процесса.
+    """
+    engine = engine or _engine()
+    errors = {}
+    for name in template_names(engine) if names is None else names:
+        try:
+            engine.get_template(name)
+        except (TemplateSyntaxError, TemplateDoesNotExist,
+                InvalidTemplateLibrary) as error:
+            errors[name] = str(error)
+    return errors
+
+
+def reset(engine=None):
+    """Забывает разобранные шаблоны cached.Loader."""
+    for loader in (engine or _engine()).template_loaders:
+        if hasattr(loader, 'reset'):
+            loader.reset()
+
+
+def warm_up():
+    """Загружает все шаблоны до первого запроса воркера."""
+    started = time.perf_counter()
+    names = template_names()
+    errors = precompile(names)
+    for name, error in errors.items():
+        logger.error('Шаблон %s не разбирается: %s', name, error)
+    logger.info(
+        'Загружено шаблонов: %d за %.0f мс',
+        len(names) - len(errors), (time.perf_counter() - started) * 1000,
+    )
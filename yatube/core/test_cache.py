@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.db import transaction
+from django.test import (RequestFactory, TestCase, TransactionTestCase,
+                         override_settings)
+
+from .cache import bump, cache_page_versioned, get_versions, page_key
+
+User = get_user_model()
+
+
+class VersionedPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+        @cache_page_versioned(lambda request: ['test'])
+        def view(request):
+            self.calls += 1
+            return HttpResponse(f'render {self.calls}')
+
+        self.view = view
+        self.request = RequestFactory().get('/page/')
+        self.request.user = AnonymousUser()
+
+    def test_page_is_cached_until_bump(self):
+        """Страница отдаётся из кеша, пока не сменится версия"""
+        self.assertEqual(self.view(self.request).content, b'render 1')
+        self.assertEqual(self.view(self.request).content, b'render 1')
+        bump('test')
+        self.assertEqual(self.view(self.request).content, b'render 2')
+
+    def test_versions_survive_cache_clear(self):
+        """После очистки кеша версия не повторяет прежнюю"""
+        before = get_versions(['test'])
+        bump('test')
+        cache.clear()
+        self.assertNotEqual(get_versions(['test']), before)
+
+    @override_settings(PAGE_CACHE_LOCK_WAIT=0.2)
+    def test_single_flight_waiter_gets_page(self):
+        """Пока страницу строит другой воркер, запрос ждёт его результата"""
+        key = page_key(self.request, ['test'], get_versions(['test']))
+        cache.add(key + ':lock', 1)
+        cache.set(key, HttpResponse('from other worker'))
+        self.assertEqual(
+            self.view(self.request).content, b'from other worker'
+        )
+        self.assertEqual(self.calls, 0)
+
+    @override_settings(PAGE_CACHE_LOCK_WAIT=0)
+    def test_single_flight_timeout_renders(self):
+        """Если строящий воркер не успел, страница строится самостоятельно"""
+        key = page_key(self.request, ['test'], get_versions(['test']))
+        cache.add(key + ':lock', 1)
+        self.assertEqual(self.view(self.request).content, b'render 1')
+
+    def test_etag_not_modified(self):
+        """Совпавший ETag даёт 304 без обращения к view, смена версии - 200"""
+        response = self.view(self.request)
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+        request = RequestFactory().get('/page/', HTTP_IF_NONE_MATCH=etag)
+        request.user = AnonymousUser()
+        self.assertEqual(self.view(request).status_code, 304)
+        self.assertEqual(self.calls, 1)
+        bump('test')
+        response = self.view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_user(self):
+        """ETag анонима не подходит авторизованному пользователю"""
+        etag = self.view(self.request)['ETag']
+        request = RequestFactory().get('/page/', HTTP_IF_NONE_MATCH=etag)
+        request.user = User.objects.create_user(username='reader')
+        response = self.view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+
+
+class BumpOnCommitTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_bump_repeats_after_commit(self):
+        """Страница, закешированная до коммита, не переживает коммит"""
+        with transaction.atomic():
+            bump('test')
+            # Параллельный запрос читает старые строки под новой версией.
+            during = get_versions(['test'])
+        self.assertNotEqual(get_versions(['test']), during)
@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.test import SimpleTestCase, override_settings
+
+from .cache import bump, get_versions
+
+
+def tiered(location, shared, **options):
+    return {
+        'default': {
+            'BACKEND': 'core.cache_backends.TieredCache',
+            'LOCATION': location,
+            'OPTIONS': dict({'LOCAL_PREFIXES': ['page:']}, **options),
+        },
+        location: shared,
+    }
+
+
+class TieredCacheTests(SimpleTestCase):
+    @override_settings(CACHES=tiered('l2-local', {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'l2-local',
+    }, LOCAL_MAX_ENTRIES=2))
+    def test_local_tier(self):
+        """Неизменяемые ключи отдаются из L1, остальные всегда из L2"""
+        cache.clear()
+        shared = caches['l2-local']
+        cache.set('page:1', {'html': 'one'})
+        cache.set('version', 'a')
+        shared.delete('page:1')
+        shared.set('version', 'b')
+        self.assertEqual(cache.get('page:1'), {'html': 'one'})
+        self.assertEqual(cache.get('version'), 'b')
+        cache.get('page:1')['html'] = 'changed'
+        self.assertEqual(cache.get_many(['page:1']), {
+            'page:1': {'html': 'one'}
+        })
+        cache.set('page:2', 2)
+        cache.set('page:3', 3)
+        self.assertIsNone(cache.get('page:1'))
+
+    def test_cross_process_invalidation(self):
+        """bump в другом процессе сразу виден через общий кеш"""
+        with tempfile.TemporaryDirectory() as directory:
+            config = tiered('l2-files', {
+                'BACKEND': (
+                    'django.core.cache.backends.filebased.FileBasedCache'
+                ),
+                'LOCATION': directory,
+            })
+            with override_settings(CACHES=config):
+                before = get_versions(['index'])
+                self.assertEqual(get_versions(['index']), before)
+                subprocess.run(
+                    [sys.executable, '-c', (
+                        'import django; django.setup(); '
+                        'from core.cache import bump; bump("index")'
+                    )],
+                    cwd=settings.BASE_DIR,
+                    env=dict(
+                        os.environ,
+                        DJANGO_SETTINGS_MODULE='yatube.settings',
+                        CACHE_LOCATION=directory,
+                    ),
+                    check=True,
+                )
+                after = get_versions(['index'])
+                self.assertNotEqual(after, before)
+                bump('index')
+                self.assertNotEqual(get_versions(['index']), after)
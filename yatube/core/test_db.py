@@ -0,0 +1,44 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from . import db
+
+
+class DatabaseProfileTests(TestCase):
+    def connect(self, **options):
+        other = connection.copy()
+        other.settings_dict.update(NAME=':memory:', OPTIONS=options)
+        self.addCleanup(other.close)
+        other.ensure_connection()
+        return other
+
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -1000})
+    def test_pragmas_applied_to_new_connections(self):
+        """Новое соединение получает PRAGMA из SQLITE_PRAGMAS"""
+        other = self.connect()
+        with other.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -1000)
+
+    def test_immediate_transactions(self):
+        """С transaction_mode транзакция начинается с BEGIN IMMEDIATE"""
+        other = self.connect(transaction_mode='IMMEDIATE')
+        with CaptureQueriesContext(other) as queries:
+            other._start_transaction_under_autocommit()
+        other.connection.rollback()
+        self.assertEqual(queries[0]['sql'], 'BEGIN IMMEDIATE')
+
+    def test_plain_begin_by_default(self):
+        """Без transaction_mode поведение Django не меняется"""
+        other = self.connect()
+        with CaptureQueriesContext(other) as queries:
+            other._start_transaction_under_autocommit()
+        other.connection.rollback()
+        self.assertEqual(queries[0]['sql'], 'BEGIN')
+
+    def test_check_connections_keeps_usable_connection(self):
+        """Проверка перед запросом не закрывает рабочее соединение"""
+        connection.ensure_connection()
+        db.check_connections()
+        self.assertIsNotNone(connection.connection)
@@ -0,0 +1,146 @@
+import pickle
+import subprocess
+import sys
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from posts.models import Post
+
+from . import jobs, workers
+from .models import Job
+
+calls = []
+
+
+@jobs.task
+def remember(value):
+    calls.append(value)
+
+
+@jobs.task
+def explode(value):
+    calls.append(value)
+    raise RuntimeError('boom')
+
+
+@jobs.task
+def duplicate_user(username):
+    get_user_model().objects.create(username=username)
+
+
+@override_settings(JOBS_EAGER=False, JOBS_MAX_ATTEMPTS=3,
+                   JOBS_RETRY_DELAY=5)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_eager_runs_immediately(self):
+        """В синхронном режиме задача выполняется сразу, без строки"""
+        with self.settings(JOBS_EAGER=True):
+            jobs.enqueue(remember, 1)
+        self.assertEqual(calls, [1])
+        self.assertFalse(Job.objects.exists())
+
+    def test_eager_db_error_keeps_transaction(self):
+        """Ошибка базы в синхронной задаче не ломает транзакцию запроса"""
+        get_user_model().objects.create(username='taken')
+        with self.settings(JOBS_EAGER=True), \
+                self.assertLogs('core.jobs', 'ERROR'):
+            jobs.enqueue(duplicate_user, 'taken')
+        self.assertEqual(get_user_model().objects.count(), 1)
+
+    def test_worker_runs_queued_job(self):
+        """run_workers --once выполняет готовые задачи"""
+        jobs.enqueue(remember, 'a')
+        jobs.enqueue(remember, 'b')
+        self.assertEqual(calls, [])
+        out = StringIO()
+        call_command('run_workers', '--once', stdout=out)
+        self.assertEqual(calls, ['a', 'b'])
+        self.assertIn('Выполнено задач: 2', out.getvalue())
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 2)
+
+    def test_worker_target_survives_spawn(self):
+        """Цель процесса-воркера сериализуется и грузится без Django"""
+        self.assertIs(pickle.loads(pickle.dumps(workers.worker)),
+                      workers.worker)
+        subprocess.run(
+            [sys.executable, '-c', 'import core.workers'],
+            cwd=settings.BASE_DIR, check=True,
+        )
+
+    def test_delayed_job_waits(self):
+        """Отложенная задача не забирается раньше срока"""
+        jobs.enqueue(remember, 1, delay=60)
+        self.assertEqual(jobs.claim(10), [])
+
+    def test_key_deduplicates_queued_jobs(self):
+        """Задача с тем же ключом не дублируется, пока ждёт в очереди"""
+        jobs.enqueue(remember, 1, key='same')
+        jobs.enqueue(remember, 1, key='same')
+        self.assertEqual(Job.objects.count(), 1)
+        jobs.run(jobs.claim(10)[0])
+        jobs.enqueue(remember, 1, key='same')
+        self.assertEqual(Job.objects.filter(status=Job.QUEUED).count(), 1)
+
+    def test_claim_is_exclusive(self):
+        """Захваченную задачу не получит другой воркер"""
+        jobs.enqueue(remember, 1)
+        self.assertEqual(len(jobs.claim(10)), 1)
+        self.assertEqual(jobs.claim(10), [])
+
+    def test_failed_job_retries_with_backoff(self):
+        """Упавшая задача повторяется с растущей паузой, затем сдаётся"""
+        jobs.enqueue(explode, 1)
+        with self.assertLogs('core.jobs', 'WARNING'):
+            job = jobs.run(jobs.claim(1)[0])
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('RuntimeError', job.error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=4))
+        self.assertEqual([jobs.backoff(n) for n in (1, 2, 3)], [5, 10, 20])
+        for _ in range(2):
+            Job.objects.update(run_at=timezone.now())
+            with self.assertLogs('core.jobs', 'WARNING'):
+                job = jobs.run(jobs.claim(1)[0])
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 3)
+        self.assertEqual(calls, [1, 1, 1])
+
+    def test_requeue_stuck(self):
+        """Задачу умершего воркера возвращают в очередь"""
+        jobs.enqueue(remember, 1)
+        jobs.claim(1)
+        Job.objects.update(started=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.requeue_stuck(), 1)
+        self.assertEqual(Job.objects.get().status, Job.QUEUED)
+
+    def test_stats(self):
+        """Метрики считают статусы и повторы по имени задачи"""
+        jobs.enqueue(remember, 1)
+        jobs.enqueue(explode, 1, max_attempts=1)
+        with self.assertLogs('core.jobs', 'ERROR'):
+            for job in jobs.claim(10):
+                jobs.run(job)
+        rows = {row['name']: row for row in jobs.stats()}
+        self.assertEqual(rows[remember.job_name][Job.DONE], 1)
+        self.assertEqual(rows[explode.job_name][Job.FAILED], 1)
+        out = StringIO()
+        call_command('run_workers', '--stats', stdout=out)
+        self.assertIn(explode.job_name, out.getvalue())
+
+    def test_post_side_effects_are_queued(self):
+        """Новый пост ставит в очередь раскладку по лентам и индексацию"""
+        author = get_user_model().objects.create_user(username='author')
+        post = Post.objects.create(author=author, text='Текст')
+        self.assertEqual(
+            set(Job.objects.values_list('key', flat=True)),
+            {f'fan_out:{post.pk}', f'search:{post.pk}'},
+        )
+        call_command('run_workers', '--once', stdout=StringIO())
+        self.assertFalse(Job.objects.exclude(status=Job.DONE).exists())
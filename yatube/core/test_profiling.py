@@ -0,0 +1,80 @@
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from . import profiling
+
+User = get_user_model()
+
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_DUMP_DIR=None)
+class ProfilingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        profiling.reset()
+        self.client = Client()
+
+    def test_server_timing_header(self):
+        """Ответ несёт замеры SQL, шаблонов и кеша"""
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for metric in ('sql;dur=', 'tpl;dur=', 'cache;desc=', 'total;dur='):
+            self.assertIn(metric, timing)
+
+    @override_settings(PROFILING_BUFFER_SIZE=10, PROFILING_DUMP_EVERY=5,
+                       PROFILING_DUMP_DIR='perf')
+    def test_dump_every_n_requests_with_full_buffer(self):
+        """Полный буфер не сбрасывается на диск на каждом запросе"""
+        with mock.patch.object(profiling, 'dump') as dump:
+            for _ in range(30):
+                profiling.record('posts:index', {})
+        self.assertEqual(dump.call_count, 6)
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_disabled_by_default(self):
+        """Без PROFILING_ENABLED middleware не подключается"""
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_duplicates_and_cache(self):
+        """Повторы запросов и попадания в кеш считаются"""
+        profiling.install()
+        with profiling.RequestProfile() as profile:
+            with connection.cursor() as cursor:
+                for _ in range(3):
+                    cursor.execute('SELECT 1')
+            cache.set('key', 1)
+            cache.get('key')
+            cache.get_many(['key', 'missing'])
+        self.assertEqual(profile.queries, 3)
+        self.assertEqual(profile.duplicates, 2)
+        self.assertEqual(profile.cache_hits, 2)
+        self.assertEqual(profile.cache_misses, 1)
+
+    def test_report_view_is_staff_only(self):
+        """Сводка доступна только сотрудникам"""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('perf_report'))
+        self.assertEqual(response.status_code, 302)
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('perf_report'), {'format': 'json'})
+        rows = {row['view']: row for row in response.json()['views']}
+        self.assertEqual(rows['posts:index']['requests'], 2)
+
+    def test_perf_report_command(self):
+        """Команда собирает сводку из сброшенных буферов"""
+        self.client.get(reverse('posts:index'))
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            profiling.dump(directory)
+            call_command('perf_report', dir=directory, stdout=out)
+        self.assertIn('posts:index', out.getvalue())
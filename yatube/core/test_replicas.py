@@ -0,0 +1,90 @@
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from posts.models import Post
+
+from . import replicas
+from .cache import _version_key, bump, cache_page_versioned
+from .middleware import ReplicaPinMiddleware
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+        @replicas.read_from_replica
+        def read(request):
+            return HttpResponse(router.db_for_read(Post))
+
+        @replicas.read_from_replica
+        def write_then_read(request):
+            router.db_for_write(Post)
+            return HttpResponse(router.db_for_read(Post))
+
+        self.read = ReplicaPinMiddleware(read)
+        self.write_then_read = ReplicaPinMiddleware(write_then_read)
+
+    def get(self, view, **cookies):
+        request = self.factory.get('/')
+        request.COOKIES.update(cookies)
+        request.user = AnonymousUser()
+        return view(request)
+
+    def test_reads_go_to_replica(self):
+        """Чтение во view с read_from_replica уходит на реплику"""
+        self.assertEqual(self.get(self.read).content, b'replica')
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_write_pins_reads_to_primary(self):
+        """После записи запрос и следующие запросы читают основную базу"""
+        response = self.get(self.write_then_read)
+        self.assertEqual(response.content, b'default')
+        cookie = response.cookies['pin_primary'].value
+        self.assertEqual(
+            self.get(self.read, pin_primary=cookie).content, b'default'
+        )
+
+    def test_pin_expires(self):
+        """Когда окно закрепления прошло, чтение снова идёт на реплику"""
+        cookie = self.get(self.write_then_read).cookies['pin_primary'].value
+        with mock.patch('core.middleware.time.time',
+                        return_value=float(cookie) + 1):
+            response = self.get(self.read, pin_primary=cookie)
+        self.assertEqual(response.content, b'replica')
+
+    def test_replicas_are_not_migrated(self):
+        """Миграции на реплики не накатываются"""
+        self.assertFalse(router.allow_migrate('replica', 'posts'))
+        self.assertTrue(router.allow_migrate('default', 'posts'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_MAX_LAG=60)
+class ReplicaPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+        @replicas.read_from_replica
+        @cache_page_versioned(lambda request: ['test'])
+        def view(request):
+            self.calls += 1
+            return HttpResponse(f'render {self.calls}')
+
+        self.view = ReplicaPinMiddleware(view)
+        self.request = RequestFactory().get('/page/')
+        self.request.user = AnonymousUser()
+
+    def test_fresh_version_from_replica_has_no_etag(self):
+        """Страница с реплики сразу после смены версии идёт без ETag"""
+        bump('test')
+        response = self.view(self.request)
+        self.assertNotIn('ETag', response)
+        cache.clear()
+        cache.set(_version_key('test'), '0.000-old', None)
+        self.assertIn('ETag', self.view(self.request))
@@ -0,0 +1,77 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.template import engines
+from django.template.library import InvalidTemplateLibrary
+from django.test import TestCase, override_settings
+
+from . import templates
+
+
+def cached_templates(*dirs):
+    return [dict(
+        settings.TEMPLATES[0],
+        DIRS=[*dirs, *settings.TEMPLATES[0]['DIRS']],
+        APP_DIRS=False,
+        OPTIONS=dict(settings.TEMPLATES[0]['OPTIONS'], loaders=[
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ]),
+    )]
+
+
+class PrecompileTemplatesTests(TestCase):
+    def test_finds_project_and_app_templates(self):
+        """В список попадают шаблоны проекта и приложений"""
+        names = templates.template_names()
+        self.assertIn('posts/index.html', names)
+        self.assertIn('includes/post_card.html', names)
+        self.assertIn('admin/base.html', names)
+
+    @override_settings(TEMPLATES=cached_templates())
+    def test_warm_up_fills_cached_loader(self):
+        """После прогрева шаблоны берутся из памяти"""
+        templates.warm_up()
+        loader = engines['django'].engine.template_loaders[0]
+        self.assertIn('posts/index.html', loader.get_template_cache)
+        self.assertIn('base.html', loader.get_template_cache)
+
+    def test_broken_template_fails_command(self):
+        """Шаблон с ошибкой роняет precompile_templates"""
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'broken.html'), 'w') as broken:
+                broken.write('{% if %}')
+            with override_settings(TEMPLATES=cached_templates(directory)):
+                errors = StringIO()
+                with self.assertRaises(CommandError):
+                    call_command('precompile_templates', stdout=StringIO(),
+                                 stderr=errors)
+        self.assertIn('broken.html', errors.getvalue())
+
+    def test_warm_up_skips_missing_and_bad_library(self):
+        """Пропавший шаблон и сломанные теги не прерывают прогрев"""
+        engine = engines['django'].engine
+        get_template = engine.get_template
+
+        def fake_get_template(name):
+            if name == 'posts/index.html':
+                raise InvalidTemplateLibrary('нет модуля')
+            return get_template(name)
+
+        names = ['gone.html', 'posts/index.html', 'base.html']
+        with mock.patch.object(templates, 'template_names',
+                               return_value=names), \
+                mock.patch.object(engine, 'get_template',
+                                  side_effect=fake_get_template), \
+                self.assertLogs('core.templates', 'ERROR') as logs:
+            templates.warm_up()
+        output = '\n'.join(logs.output)
+        self.assertIn('gone.html', output)
+        self.assertIn('posts/index.html', output)
+        self.assertNotIn('base.html', output)
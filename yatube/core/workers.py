@@ -0,0 +1,52 @@
+import signal
+import time
+
+import django
+from django.db import OperationalError, connections
+
+
+def work(batch, poll, once=False):
+    """Забирает и выполняет задачи, пока не придёт SIGTERM.
+
+    С ``once`` выполняет всё, что готово, и возвращает число задач.
+    """
+    # Модели можно импортировать только после django.setup().
+    from . import jobs
+
+    stopping = []
+    if not once:
+        # Ctrl+C ловит родитель и останавливает воркеры через SIGTERM,
+        # чтобы задачи не обрывались на середине.
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, lambda *args: stopping.append(1))
+    done = 0
+    next_requeue = 0
+    while not stopping:
+        if time.monotonic() >= next_requeue:
+            jobs.requeue_stuck()
+            next_requeue = time.monotonic() + 60
+        try:
+            claimed = jobs.claim(batch)
+        except OperationalError:
+            # Очередь занята другим воркером, заберём на следующем шаге.
+            claimed = []
+        for job in claimed:
+            jobs.run(job)
+            done += 1
+        if claimed:
+            continue
+        if once:
+            break
+        time.sleep(poll)
+    connections.close_all()
+    return done
+
+
+def worker(batch, poll):
+    """Точка входа процесса-воркера.
+
+    При старте через spawn ребёнок начинает с чистого интерпретатора,
+    поэтому модуль не импортирует модели, а Django поднимается здесь.
+    """
+    django.setup()
+    work(batch, poll)
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from posts.models import Post, Group, Comment, Follow
+from posts.models import (Post, Group, Comment, Follow, MediaFile,
+                          Notification)
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -15,3 +16,19 @@ admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
 admin.site.register(Comment)
 admin.site.register(Follow)
+
+
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'recipient', 'kind', 'actor', 'created', 'sent')
+    list_filter = ('kind', 'sent')
+
+
+admin.site.register(Notification, NotificationAdmin)
+
+
+class MediaFileAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'refs')
+    search_fields = ('name',)
+
+
+admin.site.register(MediaFile, MediaFileAdmin)
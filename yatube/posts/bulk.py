@@ -0,0 +1,27 @@
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def keep_dates(*fields):
+    """Отключает auto_now_add у полей, чтобы bulk_create сохранил даты."""
+    flags = [(field, field.auto_now_add) for field in fields]
+    for field, _ in flags:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, flag in flags:
+            field.auto_now_add = flag
+
+
+def batch_size(model, requested):
+    """Размер пачки bulk_create, который выдержит база.
+
+    Django 2.2 передаёт явный batch_size в базу как есть, а SQLite не
+    принимает больше 999 параметров и 500 строк в одном INSERT.
+    """
+    fields = model._meta.concrete_fields
+    limit = connection.ops.bulk_batch_size(fields, range(requested))
+    return max(min(requested, limit), 1)
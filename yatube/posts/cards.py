@@ -0,0 +1,66 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from . import thumbnails
+
+CARD_KEY = 'postcard:{}'
+CARD_TEMPLATE = 'includes/post_card.html'
+
+
+def card_key(post, show_author, show_group):
+    """Ключ карточки из всего, что на ней показано.
+
+    Правка поста, переименование автора или смена группы дают новый ключ,
+    а старая карточка просто дожидается вытеснения из кеша.
+    """
+    author = post.author
+    raw = '|'.join(str(part) for part in (
+        post.pk,
+        post.text,
+        post.pub_date.isoformat(),
+        post.image.name if post.image else '',
+        author.username,
+        author.get_full_name(),
+        post.group.slug if post.group_id else '',
+        show_author,
+        show_group,
+    ))
+    return CARD_KEY.format(hashlib.md5(raw.encode()).hexdigest())
+
+
+def render_cards(posts, show_author=True, show_group=True):
+    """HTML карточек страницы: один get_many, рендер только промахов.
+
+    Миниатюры всех промахов читаются разом; карточку с запасной картинкой
+    вместо миниатюры не кешируем, иначе она переживёт появление миниатюры.
+    """
+    posts = list(posts)
+    keys = [card_key(post, show_author, show_group) for post in posts]
+    cached = cache.get_many(keys)
+    ready = thumbnails.ready_many(
+        [
+            post.image for post, key in zip(posts, keys)
+            if key not in cached and post.image
+        ],
+        'card',
+    )
+    cards, fresh = [], {}
+    for post, key in zip(posts, keys):
+        card = cached.get(key)
+        if card is None:
+            variants = ready.get(post.image.name) if post.image else None
+            card = render_to_string(CARD_TEMPLATE, {
+                'post': post,
+                'show_author': show_author,
+                'show_group': show_group,
+                'variants': variants,
+            })
+            if variants is None or thumbnails.all_ready(variants):
+                fresh[key] = card
+        cards.append(card)
+    if fresh:
+        cache.set_many(fresh, settings.POST_CARD_TIMEOUT)
+    return cards
@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+# (модель, поле счётчика, что считаем, внешний ключ, с чем сравниваем ключ)
+COUNTERS = (
+    (Group, 'posts_count', Post, 'group', 'pk'),
+    (Post, 'comments_count', Comment, 'post', 'pk'),
+    (UserStats, 'posts_count', Post, 'author', 'user_id'),
+    (UserStats, 'followers_count', Follow, 'author', 'user_id'),
+    (UserStats, 'following_count', Follow, 'user', 'user_id'),
+)
+
+
+def _shift(queryset, **deltas):
+    return queryset.update(**{
+        field: Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    })
+
+
+def _actual(related, foreign_key, key):
+    return Coalesce(
+        Subquery(
+            related.objects.filter(**{foreign_key: OuterRef(key)})
+            .order_by()
+            .values(foreign_key)
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def shift_group(group_id, delta):
+    if group_id:
+        _shift(Group.objects.filter(pk=group_id), posts_count=delta)
+
+
+def shift_post(post_id, delta):
+    _shift(Post.objects.filter(pk=post_id), comments_count=delta)
+
+
+def shift_user(user_id, **deltas):
+    _shift(UserStats.objects.filter(user_id=user_id), **deltas)
+
+
+def stats_for(user_id):
+    """Счётчики пользователя, при отсутствии строки она создаётся."""
+    stats, created = UserStats.objects.get_or_create(user_id=user_id)
+    if created:
+        stats.posts_count = Post.objects.filter(author_id=user_id).count()
+        stats.followers_count = Follow.objects.filter(
+            author_id=user_id
+        ).count()
+        stats.following_count = Follow.objects.filter(
+            user_id=user_id
+        ).count()
+        stats.save()
+    return stats
+
+
+def find_drift():
+    """Строки, в которых сохранённый счётчик разошёлся с реальным числом."""
+    for model, field, related, foreign_key, key in COUNTERS:
+        rows = (
+            model.objects.order_by()
+            .annotate(actual=_actual(related, foreign_key, key))
+            .exclude(**{field: F('actual')})
+            .values_list('pk', field, 'actual')
+        )
+        for pk, stored, actual in rows.iterator():
+            yield model, field, pk, stored, actual
+
+
+def recount():
+    """Пересчитывает все счётчики, по одному UPDATE на счётчик."""
+    UserStats.objects.bulk_create(
+        (
+            UserStats(user_id=user_id)
+            for user_id in User.objects.filter(
+                stats__isnull=True
+            ).values_list('pk', flat=True)
+        ),
+        batch_size=200,
+    )
+    for model, field, related, foreign_key, key in COUNTERS:
+        model.objects.update(**{field: _actual(related, foreign_key, key)})
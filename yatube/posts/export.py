@@ -0,0 +1,86 @@
+import csv
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Follow, Group, Post
+
+# Что выгружаем: модель, поля values_list и их имена в выгрузке,
+# поле даты для выгрузки «начиная с».
+EXPORTS = {
+    'groups': (
+        Group,
+        (('id', 'id'), ('title', 'title'), ('slug', 'slug'),
+         ('description', 'description')),
+        None,
+    ),
+    'posts': (
+        Post,
+        (('id', 'id'), ('author__username', 'author'),
+         ('group__slug', 'group'), ('pub_date', 'pub_date'),
+         ('text', 'text'), ('image', 'image')),
+        'pub_date',
+    ),
+    'comments': (
+        Comment,
+        (('id', 'id'), ('post_id', 'post'), ('author__username', 'author'),
+         ('created', 'created'), ('text', 'text')),
+        'created',
+    ),
+    'follows': (
+        Follow,
+        (('id', 'id'), ('user__username', 'user'),
+         ('author__username', 'author')),
+        None,
+    ),
+}
+
+
+def columns(kind):
+    return [name for _, name in EXPORTS[kind][1]]
+
+
+def rows(kind, after_id=None, since=None):
+    """Строки выгрузки по возрастанию id, без загрузки таблицы в память.
+
+    ``after_id`` - водяной знак прошлой выгрузки, ``since`` - дата, с
+    которой выгружать посты и комментарии.
+    """
+    model, fields, date_field = EXPORTS[kind]
+    queryset = model.objects.order_by('pk')
+    if after_id is not None:
+        queryset = queryset.filter(pk__gt=after_id)
+    if since is not None and date_field:
+        queryset = queryset.filter(**{f'{date_field}__gte': since})
+    values = queryset.values_list(*(lookup for lookup, _ in fields))
+    return values.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+
+
+def ndjson(kinds, after_ids=None, since=None, marks=None):
+    """Строки NDJSON; в ``marks`` копится последний выгруженный id."""
+    after_ids = after_ids or {}
+    marks = {} if marks is None else marks
+    for kind in kinds:
+        names = columns(kind)
+        for row in rows(kind, after_ids.get(kind), since):
+            record = dict(zip(names, row), type=kind)
+            marks[kind] = row[0]
+            yield json.dumps(
+                record, cls=DjangoJSONEncoder, ensure_ascii=False
+            ) + '\n'
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def csv_lines(kind, after_id=None, since=None, marks=None):
+    """Строки CSV одной таблицы с заголовком."""
+    marks = {} if marks is None else marks
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns(kind))
+    for row in rows(kind, after_id, since):
+        marks[kind] = row[0]
+        yield writer.writerow(row)
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Follow
+
+FOLLOWING_KEY = 'following:{}'
+
+
+def following_ids(user_id):
+    """Множество id авторов, на которых подписан пользователь."""
+    key = FOLLOWING_KEY.format(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(Follow.objects.filter(
+            user_id=user_id
+        ).values_list('author_id', flat=True))
+        cache.set(key, ids, settings.FOLLOWING_CACHE_TIMEOUT)
+    return ids
+
+
+def forget(user_id):
+    key = FOLLOWING_KEY.format(user_id)
+    cache.delete(key)
+    # И ещё раз после коммита: параллельный запрос мог успеть положить в
+    # кеш множество, прочитанное до записи подписки.
+    transaction.on_commit(lambda: cache.delete(key))
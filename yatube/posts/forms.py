@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth import get_user_model
 
+from . import thumbnails
 from .models import Post, Comment
 
 User = get_user_model()
@@ -11,6 +12,12 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ("text", 'group', 'image')
 
+    def save(self, commit=True):
+        post = super().save(commit)
+        if commit and 'image' in self.changed_data and post.image:
+            thumbnails.schedule(post.image.name)
+        return post
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
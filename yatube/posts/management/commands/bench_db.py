@@ -0,0 +1,170 @@
+import random
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import Count
+from django.test import override_settings
+
+from core.bench import format_row
+from posts import counters
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+MARK = '[bench_db]'
+# Профиль: PRAGMA для каждого соединения, режим транзакций и живёт ли
+# соединение дольше одного запроса.
+PROFILES = {
+    'baseline': (
+        {'journal_mode': 'DELETE', 'synchronous': 'FULL'}, None, False,
+    ),
+    'production': (settings.SQLITE_PRODUCTION_PRAGMAS, 'IMMEDIATE', True),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite при одновременных '
+        'чтениях ленты и записи комментариев в профилях baseline '
+        '(журнал DELETE, соединение на запрос) и production (WAL, '
+        'BEGIN IMMEDIATE, постоянные соединения). Комментарии бенчмарка '
+        'удаляются в конце'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles', nargs='+', choices=list(PROFILES),
+            default=list(PROFILES),
+        )
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument(
+            '--seconds', type=float, default=10,
+            help='Длительность прогона каждого профиля',
+        )
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Профили сравниваются только для SQLite')
+        self.post_ids = list(
+            Post.objects.order_by('-pub_date')[:500]
+            .values_list('pk', flat=True)
+        )
+        self.user_ids = list(User.objects.values_list('pk', flat=True)[:500])
+        if not self.post_ids or not self.user_ids:
+            raise CommandError('Нужны посты и пользователи: seed_bench')
+        self.seed = options['seed']
+        path = settings.DATABASES['default']['NAME']
+        original = self.journal_mode(path)
+        try:
+            for name in options['profiles']:
+                self.run(name, path, options)
+        finally:
+            connections.close_all()
+            self.journal_mode(path, original)
+            self.cleanup()
+
+    def journal_mode(self, path, mode=None):
+        database = sqlite3.connect(path)
+        try:
+            if mode:
+                database.execute(f'PRAGMA journal_mode = {mode}')
+            return database.execute('PRAGMA journal_mode').fetchone()[0]
+        finally:
+            database.close()
+
+    def run(self, name, path, options):
+        pragmas, transaction_mode, persistent = PROFILES[name]
+        connections.close_all()
+        options_of_default = connections.databases['default']['OPTIONS']
+        connections.databases['default']['OPTIONS'] = dict(
+            options_of_default, transaction_mode=transaction_mode,
+        )
+        self.journal_mode(path, pragmas.get('journal_mode', 'DELETE'))
+        self.timings = defaultdict(list)
+        self.errors = Counter()
+        self.lock = threading.Lock()
+        deadline = time.monotonic() + options['seconds']
+        workers = [
+            threading.Thread(
+                target=self.work, args=(kind, number, deadline, persistent),
+            )
+            for kind, count in (
+                ('read', options['readers']), ('write', options['writers'])
+            )
+            for number in range(count)
+        ]
+        try:
+            with override_settings(SQLITE_PRAGMAS=pragmas):
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+        finally:
+            connections.databases['default']['OPTIONS'] = options_of_default
+        seconds = options['seconds']
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        for kind in ('read', 'write'):
+            self.stdout.write(
+                format_row(kind, self.timings[kind])
+                + f' {len(self.timings[kind]) / seconds:8.0f}/с'
+                + f' ошибок={self.errors[kind]}'
+            )
+
+    def work(self, kind, number, deadline, persistent):
+        rng = random.Random(f'{self.seed}-{kind}-{number}')
+        operation = getattr(self, kind)
+        done, failed = [], 0
+        try:
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    operation(rng)
+                except OperationalError:
+                    failed += 1
+                else:
+                    done.append((time.perf_counter() - started) * 1000)
+                # Без постоянных соединений каждый запрос открывает своё.
+                if not persistent:
+                    connection.close()
+        finally:
+            connection.close()
+        with self.lock:
+            self.timings[kind].extend(done)
+            self.errors[kind] += failed
+
+    def read(self, rng):
+        offset = rng.randrange(0, 50) * settings.POST_PER_PAGE
+        list(Post.objects.with_related()[
+            offset:offset + settings.POST_PER_PAGE
+        ])
+
+    def write(self, rng):
+        # То же, что add_comment: найти пост, сохранить комментарий и
+        # сдвинуть счётчик, без сброса кеша страниц.
+        with transaction.atomic():
+            post = Post.objects.only('pk').get(pk=rng.choice(self.post_ids))
+            Comment.objects.bulk_create([Comment(
+                post=post, author_id=rng.choice(self.user_ids), text=MARK,
+            )])
+            counters.shift_post(post.pk, 1)
+
+    def cleanup(self):
+        written = Comment.objects.filter(text=MARK).values(
+            'post_id'
+        ).annotate(total=Count('pk'))
+        with transaction.atomic():
+            for row in written:
+                counters.shift_post(row['post_id'], -row['total'])
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {Comment._meta.db_table} WHERE text = %s',
+                    [MARK],
+                )
@@ -0,0 +1,142 @@
+import os
+from html.parser import HTMLParser
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.models import Post
+
+DEFAULT_ACCEPT = 'image/avif,image/webp'
+
+
+class Pictures(HTMLParser):
+    """Собирает <img> страницы вместе с <source> их <picture>."""
+
+    def __init__(self):
+        super().__init__()
+        self.images = []
+        self.sources = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'picture':
+            self.sources = []
+        elif tag == 'source':
+            self.sources.append(attrs)
+        elif tag == 'img':
+            self.images.append((attrs, self.sources))
+            self.sources = []
+
+
+def _candidates(srcset):
+    for candidate in srcset.split(','):
+        if not candidate.strip():
+            continue
+        url, _, width = candidate.strip().rpartition(' ')
+        yield int(width.rstrip('w')), url
+
+
+def pick(img, sources, accept, needed):
+    """URL, который загрузит браузер: первый подходящий <source> и
+    наименьший вариант не уже ``needed`` пикселей."""
+    srcset = img.get('srcset', '')
+    for source in sources:
+        if source.get('type') in accept:
+            srcset = source['srcset']
+            break
+    candidates = sorted(_candidates(srcset))
+    if not candidates:
+        return img.get('src', '')
+    for width, url in candidates:
+        if width >= needed:
+            return url
+    return candidates[-1][1]
+
+
+def _size(url):
+    if not url.startswith(settings.MEDIA_URL):
+        return 0
+    path = os.path.join(
+        settings.MEDIA_ROOT, unquote(url[len(settings.MEDIA_URL):])
+    )
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+class Command(BaseCommand):
+    help = (
+        'Считает байты картинок, которые браузер загрузит с основных '
+        'страниц: прежняя миниатюра 960px в JPEG против варианта из '
+        '<picture> под заданный экран и форматы'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--width', type=int, default=412,
+            help='Ширина слота картинки в CSS-пикселях',
+        )
+        parser.add_argument(
+            '--dpr', type=float, default=2,
+            help='Плотность пикселей экрана',
+        )
+        parser.add_argument(
+            '--accept', default=DEFAULT_ACCEPT,
+            help='Форматы, которые понимает браузер, через запятую',
+        )
+        parser.add_argument(
+            '--generate', action='store_true',
+            help='Сначала сгенерировать недостающие варианты',
+        )
+
+    def handle(self, *args, **options):
+        if options['generate']:
+            for name in Post.objects.exclude(image='').order_by().values_list(
+                'image', flat=True
+            ).distinct().iterator():
+                thumbnails.generate(name)
+        accept = set(options['accept'].split(','))
+        needed = options['width'] * options['dpr']
+        client = Client()
+        total_old = total_new = 0
+        self.stdout.write(
+            f'Экран {options["width"]}px x {options["dpr"]}, '
+            f'форматы: {options["accept"] or "только JPEG"}'
+        )
+        for title, url in self.pages():
+            parser = Pictures()
+            parser.feed(client.get(url).content.decode())
+            old = new = count = 0
+            for img, sources in parser.images:
+                if not img.get('src', '').startswith(settings.MEDIA_URL):
+                    continue
+                count += 1
+                old += _size(img['src'])
+                new += _size(pick(img, sources, accept, needed))
+            total_old += old
+            total_new += new
+            self.stdout.write(self.row(title, url, count, old, new))
+        self.stdout.write(self.style.SUCCESS(
+            self.row('Всего', '', '', total_old, total_new)
+        ))
+
+    def row(self, title, url, count, old, new):
+        saved = (old - new) / old * 100 if old else 0
+        return (
+            f'{title:<12} {url:<32} {count!s:>4} {old / 1024:>9.1f} КБ '
+            f'-> {new / 1024:>9.1f} КБ  экономия {saved:>5.1f}%'
+        )
+
+    def pages(self):
+        yield 'index', reverse('posts:index')
+        post = Post.objects.exclude(image='').select_related(
+            'author', 'group'
+        ).order_by('-pub_date').first()
+        if post is None:
+            return
+        yield 'profile', reverse('posts:profile', args=[post.author.username])
+        if post.group_id:
+            yield 'group', reverse('posts:post_list', args=[post.group.slug])
+        yield 'post_detail', reverse('posts:post_detail', args=[post.pk])
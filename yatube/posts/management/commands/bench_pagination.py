@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+
+from core.bench import format_row, measure
+from posts.models import Post
+from posts.utils import FEED_ORDERING, CursorPaginator
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает OFFSET- и курсорную паджинацию на глубоких страницах'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fill', type=int, default=0,
+            help='Сколько постов досоздать перед замером',
+        )
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument(
+            '--pages', type=int, nargs='+', default=[1, 100, 10000],
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if options['fill']:
+            self.fill(options['fill'], options['batch_size'])
+        per_page = settings.POST_PER_PAGE
+        queryset = Post.objects.order_by(*FEED_ORDERING)
+        self.stdout.write(f'Постов в базе: {Post.objects.count()}')
+        for number in options['pages']:
+            offset = (number - 1) * per_page
+            if number > 1 and not queryset[offset - 1:offset].exists():
+                self.stdout.write(f'Страницы {number} нет, пропускаю')
+                continue
+            self.stdout.write(format_row(
+                f'offset, page {number}',
+                measure(
+                    lambda: list(Paginator(queryset, per_page).page(number)),
+                    options['repeat'],
+                ),
+            ))
+            if number == 1:
+                timings = measure(
+                    lambda: CursorPaginator(
+                        Post.objects.all(), per_page, numbered_pages=1
+                    ).page(1),
+                    options['repeat'],
+                )
+            else:
+                anchor = queryset.only('pub_date')[offset - 1]
+                cursor = CursorPaginator(
+                    Post.objects.all(), per_page
+                ).encode_cursor(anchor)
+                timings = measure(
+                    lambda: CursorPaginator(
+                        Post.objects.all(), per_page
+                    ).cursor_page(cursor),
+                    options['repeat'],
+                )
+            self.stdout.write(format_row(f'cursor, page {number}', timings))
+
+    def fill(self, total, batch_size):
+        author, _ = User.objects.get_or_create(username='bench_author')
+        created = 0
+        while created < total:
+            size = min(batch_size, total - created)
+            Post.objects.bulk_create(
+                Post(author=author, text=f'Пост для замера {created + i}')
+                for i in range(size)
+            )
+            created += size
+            self.stdout.write(f'Создано {created} из {total}')
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.bench import format_row, measure
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает поиск по полнотекстовому индексу с перебором LIKE'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--query', nargs='+', default=['12345', 'замера 12345', 'пост'],
+            help='Поисковые запросы для замера',
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Перестроить индекс (нужно после bulk_create)',
+        )
+
+    def handle(self, *args, **options):
+        if search.backend() is None:
+            raise CommandError(
+                'Полнотекстовый индекс для этой базы не настроен'
+            )
+        if options['rebuild']:
+            search.rebuild()
+            self.stdout.write('Индекс перестроен')
+        per_page = settings.POST_PER_PAGE
+        for query in options['query']:
+            self.stdout.write(format_row(
+                f'like, {query!r}',
+                measure(
+                    lambda: search.like_scan(query, per_page),
+                    options['repeat'],
+                ),
+            ))
+            self.stdout.write(format_row(
+                f'index, {query!r}',
+                measure(
+                    lambda: search.search(query, per_page),
+                    options['repeat'],
+                ),
+            ))
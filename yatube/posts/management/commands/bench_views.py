@@ -0,0 +1,188 @@
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from core.bench import format_row, summary
+from core.queries import QueryCounter
+from posts.models import Group, Post
+
+User = get_user_model()
+
+VIEWS = (
+    'index', 'group_posts', 'profile', 'post_detail', 'follow_index',
+    'add_comment',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет запросы к основным страницам и печатает задержки, '
+        'число SQL-запросов и пропускную способность. add_comment '
+        'создаёт настоящие комментарии'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--views', nargs='+', choices=VIEWS, default=list(VIEWS),
+        )
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Запросов к каждой странице',
+        )
+        parser.add_argument(
+            '--max-page', type=int, default=1,
+            help='Страницы лент выбираются случайно от 1 до этого номера',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Сколько запросов выполняется одновременно',
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом',
+        )
+        parser.add_argument(
+            '--history',
+            help='Файл JSON Lines: сравнить с прошлым прогоном и дописать '
+                 'результаты этого',
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.max_page = options['max_page']
+        self.targets = self.load_targets()
+        self.cold = options['cold']
+        self.clients = threading.local()
+        previous = self.last_run(options['history'])
+        results = {}
+        pool = None
+        if options['concurrency'] > 1:
+            pool = ThreadPoolExecutor(options['concurrency'])
+        run = pool.map if pool else map
+        for view in options['views']:
+            requests = [
+                getattr(self, f'hit_{view}')()
+                for _ in range(options['requests'])
+            ]
+            started = time.perf_counter()
+            timings, queries = zip(*run(
+                lambda request: self.send(view, *request), requests
+            ))
+            elapsed = time.perf_counter() - started
+            results[view] = dict(
+                summary(timings),
+                queries=sum(queries) / len(queries),
+                rps=len(timings) / elapsed,
+            )
+            self.report(view, timings, results[view], previous.get(view))
+        if pool:
+            pool.shutdown()
+        if options['history']:
+            with open(options['history'], 'a') as history:
+                history.write(json.dumps({
+                    'date': timezone.now().isoformat(),
+                    'options': {
+                        key: options[key]
+                        for key in (
+                            'requests', 'max_page', 'seed', 'cold',
+                            'concurrency',
+                        )
+                    },
+                    'results': results,
+                }) + '\n')
+
+    def send(self, view, authenticated, method, url, data):
+        # Test client не рассчитан на общий доступ из потоков,
+        # поэтому у каждого потока свои клиенты.
+        if not hasattr(self.clients, 'anonymous'):
+            self.clients.anonymous = Client()
+            self.clients.reader = Client()
+            self.clients.reader.force_login(self.targets['reader'])
+        client = self.clients.reader if authenticated else (
+            self.clients.anonymous
+        )
+        if self.cold:
+            cache.clear()
+        with QueryCounter() as counter:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code >= 400:
+            raise CommandError(f'{view}: {url} ответил {response.status_code}')
+        return elapsed, counter.count
+
+    def load_targets(self):
+        reader = User.objects.order_by('-stats__following_count').first()
+        post_ids = list(Post.objects.order_by('-pub_date').values_list(
+            'pk', flat=True
+        )[:1000])
+        if reader is None or not post_ids:
+            raise CommandError('База пуста, сначала запустите seed_bench')
+        return {
+            'reader': reader,
+            'groups': list(Group.objects.order_by(
+                '-posts_count'
+            ).values_list('slug', flat=True)[:100]),
+            'authors': list(User.objects.order_by(
+                '-stats__posts_count'
+            ).values_list('username', flat=True)[:100]),
+            'posts': post_ids,
+        }
+
+    def last_run(self, path):
+        if not path:
+            return {}
+        try:
+            with open(path) as history:
+                lines = history.read().splitlines()
+        except FileNotFoundError:
+            return {}
+        return json.loads(lines[-1])['results'] if lines else {}
+
+    def report(self, view, timings, result, previous):
+        line = '{} q/req={:5.1f} rps={:7.1f}'.format(
+            format_row(view, timings), result['queries'], result['rps']
+        )
+        if previous:
+            change = (result['p95'] / previous['p95'] - 1) * 100
+            line += f' p95 {change:+.0f}%'
+        self.stdout.write(line)
+
+    def page(self):
+        return {'page': self.rng.randint(1, self.max_page)}
+
+    def hit_index(self):
+        return False, 'get', reverse('posts:index'), self.page()
+
+    def hit_group_posts(self):
+        slug = self.rng.choice(self.targets['groups'])
+        url = reverse('posts:post_list', args=[slug])
+        return False, 'get', url, self.page()
+
+    def hit_profile(self):
+        username = self.rng.choice(self.targets['authors'])
+        url = reverse('posts:profile', args=[username])
+        return False, 'get', url, self.page()
+
+    def hit_post_detail(self):
+        post_id = self.rng.choice(self.targets['posts'])
+        url = reverse('posts:post_detail', args=[post_id])
+        return False, 'get', url, {}
+
+    def hit_follow_index(self):
+        return True, 'get', reverse('posts:follow_index'), self.page()
+
+    def hit_add_comment(self):
+        post_id = self.rng.choice(self.targets['posts'])
+        url = reverse('posts:add_comment', args=[post_id])
+        return True, 'post', url, {'text': 'Комментарий для замера'}
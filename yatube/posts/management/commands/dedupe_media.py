@@ -0,0 +1,88 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from core.cache import bump
+from posts import media, thumbnails
+from posts.models import MediaFile, Post
+from posts.signals import post_namespaces
+from posts.storage import is_hashed
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов в хранилище по хешу содержимого: '
+        'одинаковые файлы схлопываются в один, посты переключаются на него, '
+        'старые файлы и их миниатюры удаляются'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать, сколько места освободится',
+        )
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        names = [
+            name for name in Post.objects.exclude(image='').order_by()
+            .values_list('image', flat=True).distinct().iterator()
+            if not is_hashed(name)
+        ]
+        self.stdout.write(f'Файлов со старыми именами: {len(names)}')
+        before = after = moved = 0
+        targets = set()
+        touched = set()
+        for name in names:
+            if not storage.exists(name):
+                self.stderr.write(f'{name}: файл не найден')
+                continue
+            size = storage.size(name)
+            with storage.open(name) as content:
+                target = storage.content_name(name, content)
+            if target not in targets and not storage.exists(target):
+                after += size
+            targets.add(target)
+            before += size
+            moved += 1
+            if not options['dry_run']:
+                with storage.open(name) as content:
+                    storage.save(name, content)
+                touched.update(self.switch(name, target))
+        if not options['dry_run']:
+            media.recount()
+            touched = sorted(touched)
+            for start in range(0, len(touched), 1000):
+                bump(*touched[start:start + 1000])
+            for target in targets:
+                thumbnails.schedule(target)
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Будет перенесено" if options["dry_run"] else "Перенесено"} '
+            f'файлов: {moved}, уникальных: {len(targets)}, '
+            f'было {before / 2 ** 20:.1f} МБ, стало {after / 2 ** 20:.1f} МБ, '
+            f'освобождено {(before - after) / 2 ** 20:.1f} МБ'
+        ))
+
+    def switch(self, name, target):
+        """Переключает посты на новое имя; старый файл удаляется после
+        коммита, чтобы при откате посты не остались без картинки."""
+        posts = Post.objects.filter(image=name).select_related(
+            'author', 'group'
+        )
+        namespaces = set()
+        with transaction.atomic():
+            for post in posts:
+                namespaces.update(post_namespaces(post))
+            posts.update(image=target)
+            transaction.on_commit(lambda: self.remove(name))
+        return namespaces
+
+    def remove(self, name):
+        storage = Post._meta.get_field('image').storage
+        thumbnails.delete(name)
+        # Миниатюры, сделанные до перехода на хранилище по хешу, записаны
+        # в sorl под хранилищем по умолчанию.
+        default.kvstore.delete(ImageFile(name, default.storage))
+        storage.delete(name)
+        MediaFile.objects.filter(name=name).delete()
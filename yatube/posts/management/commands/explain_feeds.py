@@ -0,0 +1,89 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.models import Group, Post
+from posts.timeline import timeline_feed
+from posts.utils import COMMENT_ORDERINGS, FEED_ORDERING, CursorPaginator
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Печатает планы запросов, которые выполняют ленты и страница поста'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--author', help='username автора для профиля')
+        parser.add_argument('--group', help='slug группы')
+        parser.add_argument('--reader', help='username для ленты подписок')
+        parser.add_argument('--post', type=int, help='id поста')
+        parser.add_argument(
+            '--sql', action='store_true', help='Печатать и сам SQL',
+        )
+
+    def handle(self, *args, **options):
+        self.show_sql = options['sql']
+        author = self.pick(
+            User.objects.order_by('-stats__posts_count'),
+            username=options['author'],
+        )
+        group = self.pick(Group.objects.all(), slug=options['group'])
+        reader = self.pick(
+            User.objects.order_by('-stats__following_count'),
+            username=options['reader'],
+        )
+        post = self.pick(
+            Post.objects.order_by('-comments_count'), pk=options['post']
+        )
+        feeds = {'index': (Post.objects.with_related(), FEED_ORDERING)}
+        if author:
+            feeds['profile'] = (author.posts.with_related(), FEED_ORDERING)
+        if group:
+            feeds['group_posts'] = (group.posts.with_related(), FEED_ORDERING)
+        if reader:
+            feeds['follow_index'] = timeline_feed(reader)
+        for name, (queryset, ordering) in feeds.items():
+            self.explain_feed(name, CursorPaginator(
+                queryset,
+                settings.POST_PER_PAGE,
+                ordering=ordering,
+                numbered_pages=settings.POST_NUMBERED_PAGES,
+            ))
+        if post:
+            for order, ordering in COMMENT_ORDERINGS.items():
+                self.explain_feed(f'post_detail comments ({order})', (
+                    CursorPaginator(
+                        post.comments.with_related(),
+                        settings.COMMENTS_PER_PAGE,
+                        ordering=ordering,
+                        numbered_pages=1,
+                    )
+                ))
+
+    def pick(self, queryset, **lookup):
+        field, value = lookup.popitem()
+        if value is None:
+            return queryset.first()
+        try:
+            return queryset.get(**{field: value})
+        except queryset.model.DoesNotExist:
+            raise CommandError(
+                f'{queryset.model._meta.verbose_name} {value} не найден'
+            )
+
+    def explain_feed(self, name, paginator):
+        window = paginator.numbered_pages * paginator.per_page
+        queries = {
+            'count': paginator.object_list[:window + 1],
+            'first page': paginator.object_list[:paginator.per_page],
+        }
+        last = paginator.object_list.last()
+        if last is not None:
+            anchor = paginator.decode_cursor(paginator.encode_cursor(last))
+            queries['cursor page'] = paginator.keyset_queryset(anchor[0])
+        for label, queryset in queries.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{name}: {label}'))
+            if self.show_sql:
+                self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain())
+            self.stdout.write('')
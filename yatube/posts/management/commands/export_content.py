@@ -0,0 +1,100 @@
+import json
+import os
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from posts import export
+
+
+def parse_since(value):
+    try:
+        moment = parse_datetime(value)
+        day = parse_date(value) if moment is None else None
+    except ValueError:
+        raise CommandError(f'Несуществующая дата {value!r}')
+    if moment is None:
+        if day is None:
+            raise CommandError(f'Не удалось разобрать дату {value!r}')
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает группы, посты, комментарии и подписки в NDJSON '
+        'или CSV. С --state выгружает только новое с прошлого запуска'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--types', nargs='+', choices=list(export.EXPORTS),
+            default=list(export.EXPORTS),
+        )
+        parser.add_argument(
+            '--format', choices=('ndjson', 'csv'), default='ndjson',
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для NDJSON или каталог для CSV; по умолчанию stdout',
+        )
+        parser.add_argument(
+            '--since', help='Посты и комментарии не старше этой даты',
+        )
+        parser.add_argument(
+            '--state',
+            help='JSON с последними выгруженными id, обновляется по итогам',
+        )
+
+    def handle(self, *args, **options):
+        since = options['since'] and parse_since(options['since'])
+        after_ids = self.load_state(options['state'])
+        marks = dict(after_ids)
+        if options['format'] == 'ndjson':
+            self.write(options['output'], export.ndjson(
+                options['types'], after_ids, since, marks
+            ))
+        else:
+            self.write_csv(options, after_ids, since, marks)
+        if options['state']:
+            with open(options['state'], 'w') as state:
+                json.dump(marks, state)
+        self.stderr.write('Последние id: ' + ', '.join(
+            f'{kind}={marks.get(kind, "-")}' for kind in options['types']
+        ))
+
+    def load_state(self, path):
+        if not path or not os.path.exists(path):
+            return {}
+        with open(path) as state:
+            return json.load(state)
+
+    def write(self, path, lines):
+        if path is None:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(path, 'w', newline='', encoding='utf-8') as output:
+            output.writelines(lines)
+
+    def write_csv(self, options, after_ids, since, marks):
+        if options['output'] is None:
+            if len(options['types']) > 1:
+                raise CommandError(
+                    'Для CSV нескольких таблиц укажите каталог в --output'
+                )
+            kind = options['types'][0]
+            self.write(None, export.csv_lines(
+                kind, after_ids.get(kind), since, marks
+            ))
+            return
+        os.makedirs(options['output'], exist_ok=True)
+        for kind in options['types']:
+            self.write(
+                os.path.join(options['output'], f'{kind}.csv'),
+                export.csv_lines(kind, after_ids.get(kind), since, marks),
+            )
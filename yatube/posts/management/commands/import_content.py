@@ -0,0 +1,411 @@
+import csv
+import json
+import os
+import sys
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from core.cache import bump
+from posts import counters, media, search
+from posts.bulk import batch_size, keep_dates
+from posts.export import EXPORTS
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Порядок записи внутри транзакции: сначала то, на что ссылаются.
+ORDER = ('groups', 'posts', 'comments', 'follows')
+MODELS = {
+    'groups': Group,
+    'posts': Post,
+    'comments': Comment,
+    'follows': Follow,
+}
+# Поля, по которым строка выгрузки совпадает со строкой базы под тем же id:
+# (поле в базе, поле выгрузки).
+IDENTITY = {
+    'groups': (('slug', 'slug'),),
+    'posts': (('author__username', 'author'), ('text', 'text')),
+    'comments': (
+        ('post_id', 'post'), ('author__username', 'author'), ('text', 'text'),
+    ),
+    'follows': (('user__username', 'user'), ('author__username', 'author')),
+}
+
+
+def _id(value):
+    return int(value) if value not in (None, '') else None
+
+
+def existing_ids(model, ids):
+    found = set()
+    for start in range(0, len(ids), 500):
+        found.update(model.objects.filter(
+            pk__in=ids[start:start + 500]
+        ).values_list('pk', flat=True))
+    return found
+
+
+def clashes(kind, records):
+    """id строк выгрузки, под которыми в базе лежат другие строки."""
+    fields = IDENTITY[kind]
+    by_id = {
+        _id(record['id']): record for record in records
+        if _id(record['id']) is not None
+    }
+    ids = list(by_id)
+    found = []
+    for start in range(0, len(ids), 500):
+        rows = MODELS[kind].objects.filter(
+            pk__in=ids[start:start + 500]
+        ).values_list('pk', *(lookup for lookup, _ in fields))
+        for pk, *values in rows:
+            record = by_id[pk]
+            if any(
+                str(value) != str(record[field])
+                for value, (_, field) in zip(values, fields)
+            ):
+                found.append(pk)
+    return found
+
+
+def _preview(ids):
+    ids = sorted(ids)
+    return ', '.join(map(str, ids[:10])) + (' ...' if len(ids) > 10 else '')
+
+
+@contextmanager
+def without_indexes(*models):
+    """Снимает вторичные индексы моделей на время загрузки."""
+    # SQL берётся у schema editor без входа в него: SQLite не даёт открыть
+    # editor внутри транзакции, а DROP/CREATE INDEX в ней выполнимы.
+    editor = connection.schema_editor()
+    indexes = [(model, index) for model in models
+               for index in model._meta.indexes]
+    with connection.cursor() as cursor:
+        for model, index in indexes:
+            cursor.execute(str(index.remove_sql(model, editor)))
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for model, index in indexes:
+                cursor.execute(str(index.create_sql(model, editor)))
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает выгрузку export_content (NDJSON или CSV) через '
+        'bulk_create. id исходных строк сохраняются, уже загруженные строки '
+        'пропускаются, поэтому прерванную загрузку можно повторить. '
+        'Если id выгрузки заняты в базе другими строками, загрузка '
+        'останавливается до записи'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='+', help='Файлы выгрузки, - для stdin',
+        )
+        parser.add_argument(
+            '--type', choices=list(EXPORTS),
+            help='Тип строк CSV; по умолчанию берётся из имени файла',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Строк в одном INSERT (не больше, чем позволяет база)',
+        )
+        parser.add_argument(
+            '--transaction-size', type=int, default=50000,
+            help='Строк в одной транзакции',
+        )
+        parser.add_argument(
+            '--drop-indexes', action='store_true',
+            help='Снять индексы постов и комментариев на время загрузки',
+        )
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help='Не пересчитывать счётчики, поиск и ленты после загрузки',
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.buffers = {kind: [] for kind in ORDER}
+        self.counts = Counter()
+        self.skipped = Counter()
+        self.unknown_groups = set()
+        # Сигналы при bulk_create не срабатывают, поэтому затронутые
+        # страницы сбрасываются после загрузки одним проходом.
+        # Страниц новых постов и авторов ещё нет в кеше, их не трогаем.
+        self.touched = {'index'}
+        self.new_posts = set()
+        self.new_users = set()
+        self.loaded_posts = set()
+        started = time.perf_counter()
+        # Файлы проверяются целиком до первой записи; stdin второй раз не
+        # прочитать, его пачки проверяются перед записью каждой.
+        self.checked = '-' not in options['paths']
+        if self.checked:
+            self.check(options['paths'], options['type'])
+        with ExitStack() as stack:
+            stack.enter_context(keep_dates(
+                Post._meta.get_field('pub_date'),
+                Comment._meta.get_field('created'),
+            ))
+            if options['drop_indexes']:
+                stack.enter_context(without_indexes(Post, Comment))
+            pending = 0
+            for kind, record in self.read(options['paths'], options['type']):
+                self.buffers[kind].append(record)
+                pending += 1
+                if pending >= options['transaction_size']:
+                    self.flush(started)
+                    pending = 0
+            self.flush(started)
+        self.reset_sequences()
+        touched = sorted(self.touched)
+        for start in range(0, len(touched), 1000):
+            bump(*touched[start:start + 1000])
+        if self.skipped:
+            self.stderr.write(
+                'Пропущены строки, чьи id или ключи уже заняты в базе. '
+                'При повторной загрузке это ожидаемо, иначе данные '
+                'выгрузки пересекаются с существующими: ' + ', '.join(
+                    f'{kind}: {self.skipped[kind]}'
+                    for kind in ORDER if self.skipped[kind]
+                )
+            )
+        if self.unknown_groups:
+            self.stderr.write(
+                'Группы не найдены, посты загружены без группы: '
+                + ', '.join(sorted(self.unknown_groups))
+            )
+        elapsed = time.perf_counter() - started
+        total = sum(self.counts.values())
+        self.stdout.write(
+            f'Загружено строк: {total} за {elapsed:.1f} с '
+            f'({total / elapsed if elapsed else 0:.0f} строк/с)'
+        )
+        if not options['skip_rebuild']:
+            self.stdout.write('Пересчитываю счётчики, поиск и ленты')
+            counters.recount()
+            media.recount()
+            search.rebuild()
+            call_command('rebuild_timelines', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.perf_counter() - started:.1f} с'
+        ))
+
+    def read(self, paths, kind):
+        for path in paths:
+            with self.open(path) as source:
+                if path.endswith('.csv') or kind:
+                    table = kind or os.path.splitext(
+                        os.path.basename(path)
+                    )[0]
+                    if table not in EXPORTS:
+                        raise CommandError(
+                            f'{path}: укажите тип строк через --type'
+                        )
+                    for record in csv.DictReader(source):
+                        yield table, record
+                    continue
+                for number, line in enumerate(source, start=1):
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    table = record.pop('type', None)
+                    if table not in EXPORTS:
+                        raise CommandError(
+                            f'{path}:{number}: неизвестный тип {table!r}'
+                        )
+                    yield table, record
+
+    @contextmanager
+    def open(self, path):
+        if path == '-':
+            yield sys.stdin
+            return
+        with open(path, newline='', encoding='utf-8') as source:
+            yield source
+
+    def check(self, paths, kind):
+        buffers = {table: [] for table in ORDER}
+        posts = set()
+        for table, record in self.read(paths, kind):
+            buffers[table].append(record)
+            if len(buffers[table]) >= 5000:
+                self.check_batch(table, buffers[table], posts)
+                buffers[table].clear()
+        for table in ORDER:
+            self.check_batch(table, buffers[table], posts)
+
+    def check_batch(self, kind, records, posts):
+        """Останавливает загрузку, если строки выгрузки разойдутся с базой.
+
+        ``posts`` копит id постов выгрузки: комментарий должен ссылаться на
+        один из них или на пост, который уже есть в базе.
+        """
+        clashing = clashes(kind, records)
+        if clashing:
+            raise CommandError(
+                f'{kind}: id {_preview(clashing)} в базе заняты другими '
+                'строками. Выгрузку можно загрузить в пустую базу или '
+                'повторно в ту же, но не в базу с пересекающимися id'
+            )
+        if kind == 'posts':
+            posts.update(_id(record['id']) for record in records)
+        elif kind == 'comments':
+            post_ids = {_id(record['post']) for record in records} - posts
+            missing = post_ids - existing_ids(Post, list(post_ids))
+            if missing:
+                raise CommandError(
+                    f'comments: нет постов {_preview(missing)}, на которые '
+                    'ссылаются комментарии'
+                )
+
+    def flush(self, started):
+        with transaction.atomic():
+            for kind in ORDER:
+                records = self.buffers[kind]
+                if not records:
+                    continue
+                model = MODELS[kind]
+                # ignore_conflicts не сообщает, что именно вставлено,
+                # поэтому вставленные строки считаются по id до и после.
+                ids = [
+                    pk for pk in (_id(record['id']) for record in records)
+                    if pk is not None
+                ]
+                if not self.checked:
+                    self.check_batch(kind, records, self.loaded_posts)
+                before = existing_ids(model, ids)
+                if kind == 'posts':
+                    self.new_posts.update(set(ids) - before)
+                objects = getattr(self, f'build_{kind}')(records)
+                model.objects.bulk_create(
+                    objects,
+                    batch_size=batch_size(model, self.batch_size),
+                    ignore_conflicts=True,
+                )
+                inserted = len(existing_ids(model, ids) - before) + (
+                    len(records) - len(ids)
+                )
+                self.counts[kind] += inserted
+                self.skipped[kind] += len(records) - inserted
+                records.clear()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(', '.join(
+            f'{kind}: {self.counts[kind]}' for kind in ORDER
+        ) + f' ({sum(self.counts.values()) / elapsed:.0f} строк/с)')
+
+    def user_ids(self, usernames):
+        missing = {name for name in usernames if name not in self.users}
+        if missing:
+            self.new_users.update(missing)
+            User.objects.bulk_create(
+                [User(username=name, password='!') for name in missing],
+                batch_size=batch_size(User, self.batch_size),
+                ignore_conflicts=True,
+            )
+            missing = list(missing)
+            for start in range(0, len(missing), 500):
+                self.users.update(User.objects.filter(
+                    username__in=missing[start:start + 500]
+                ).values_list('username', 'pk'))
+        return self.users
+
+    def group_id(self, slug):
+        if not slug:
+            return None
+        if slug not in self.groups:
+            self.unknown_groups.add(slug)
+            return None
+        return self.groups[slug]
+
+    def build_groups(self, records):
+        groups = []
+        for record in records:
+            self.groups.setdefault(record['slug'], _id(record['id']))
+            self.touched.add(f'group:{record["slug"]}')
+            groups.append(Group(
+                id=_id(record['id']),
+                title=record['title'],
+                slug=record['slug'],
+                description=record['description'],
+            ))
+        return groups
+
+    def build_posts(self, records):
+        users = self.user_ids(record['author'] for record in records)
+        for record in records:
+            if record['author'] not in self.new_users:
+                self.touched.add(f'profile:{record["author"]}')
+            if record.get('group'):
+                self.touched.add(f'group:{record["group"]}')
+        return [
+            Post(
+                id=_id(record['id']),
+                author_id=users[record['author']],
+                group_id=self.group_id(record.get('group')),
+                pub_date=parse_datetime(record['pub_date']),
+                text=record['text'],
+                image=record.get('image') or '',
+            )
+            for record in records
+        ]
+
+    def build_comments(self, records):
+        users = self.user_ids(record['author'] for record in records)
+        self.touched.update(
+            f'post:{record["post"]}' for record in records
+            if _id(record['post']) not in self.new_posts
+        )
+        return [
+            Comment(
+                id=_id(record['id']),
+                post_id=_id(record['post']),
+                author_id=users[record['author']],
+                created=parse_datetime(record['created']),
+                text=record['text'],
+            )
+            for record in records
+        ]
+
+    def build_follows(self, records):
+        users = self.user_ids(
+            name for record in records
+            for name in (record['user'], record['author'])
+        )
+        self.touched.update(
+            f'profile:{record["author"]}' for record in records
+            if record['author'] not in self.new_users
+        )
+        return [
+            Follow(
+                id=_id(record['id']),
+                user_id=users[record['user']],
+                author_id=users[record['author']],
+            )
+            for record in records
+        ]
+
+    def reset_sequences(self):
+        # Строки пришли с явными id: счётчики автоинкремента в Postgres
+        # нужно сдвинуть за них, иначе следующий INSERT упадёт.
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [User, *MODELS.values()]
+        )
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.models import Follow, TimelineEntry
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок'
+
+    def handle(self, *args, **options):
+        TimelineEntry.objects.all().delete()
+        celebrities = timeline.celebrity_ids(
+            Follow.objects.values('author_id')
+        )
+        readers = Follow.objects.order_by('user_id').values_list(
+            'user_id', flat=True
+        ).distinct()
+        for number, user_id in enumerate(readers.iterator(), start=1):
+            timeline.rebuild(user_id, celebrities)
+            if number % 1000 == 0:
+                self.stdout.write(f'Обработано читателей: {number}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в лентах: {TimelineEntry.objects.count()}'
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, комментариев и подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только найти расхождения, ничего не меняя',
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            counters.recount()
+            self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны'))
+            return
+        drift = 0
+        for model, field, pk, stored, actual in counters.find_drift():
+            drift += 1
+            self.stdout.write(
+                f'{model._meta.label} pk={pk} {field}: '
+                f'{stored} вместо {actual}'
+            )
+        if drift:
+            raise CommandError(f'Расхождений в счётчиках: {drift}')
+        self.stdout.write(self.style.SUCCESS('Расхождений нет'))
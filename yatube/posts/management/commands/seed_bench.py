@@ -0,0 +1,206 @@
+import bisect
+import itertools
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from faker import Faker
+
+from posts import counters, search
+from posts.bulk import keep_dates
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def power_law(size, exponent):
+    """Накопленные веса Ципфа: первые элементы выбираются чаще остальных."""
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, size + 1)
+    ))
+
+
+def pick(rng, items, cum_weights):
+    position = rng.random() * cum_weights[-1]
+    return items[bisect.bisect_right(cum_weights, position)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу воспроизводимым набором данных для нагрузочных '
+        'замеров: пользователи, группы, посты, комментарии и граф подписок '
+        'со степенным распределением'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=200000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок на пользователя',
+        )
+        parser.add_argument(
+            '--exponent', type=float, default=1.1,
+            help='Показатель степенного закона популярности авторов',
+        )
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument(
+            '--prefix', default='seed_',
+            help='Префикс имён создаваемых пользователей и групп',
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        faker = Faker('ru_RU')
+        faker.seed_instance(options['seed'])
+        self.words = faker.words(nb=3000)
+        self.batch_size = options['batch_size']
+        self.prefix = options['prefix']
+        self.now = timezone.now()
+        self.days = options['days']
+
+        user_ids = self.seed_users(options['users'])
+        group_ids = self.seed_groups(options['groups'])
+        popularity = power_law(len(user_ids), options['exponent'])
+        post_ids = self.seed_posts(
+            options['posts'], user_ids, popularity, group_ids
+        )
+        self.seed_comments(
+            options['comments'],
+            user_ids,
+            post_ids,
+            power_law(len(post_ids), options['exponent']),
+        )
+        self.seed_follows(
+            options['follows'], user_ids, popularity
+        )
+
+        self.stdout.write('Пересчитываю счётчики и индексы')
+        counters.recount()
+        search.rebuild()
+        call_command('rebuild_timelines', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS('Готово'))
+
+    def text(self, low, high):
+        return ' '.join(self.rng.choices(self.words, k=self.rng.randint(
+            low, high
+        ))).capitalize()
+
+    def insert(self, model, objects, label, total):
+        created = 0
+        while True:
+            batch = list(itertools.islice(objects, self.batch_size))
+            if not batch:
+                break
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            created += len(batch)
+            self.stdout.write(f'{label}: {created} из {total}')
+
+    def seed_users(self, total):
+        start = User.objects.filter(
+            username__startswith=self.prefix
+        ).count()
+        self.insert(
+            User,
+            (
+                User(username=f'{self.prefix}{number}', password='!')
+                for number in range(start, start + total)
+            ),
+            'Пользователи',
+            total,
+        )
+        return list(User.objects.filter(
+            username__startswith=self.prefix
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def seed_groups(self, total):
+        start = Group.objects.filter(slug__startswith=self.prefix).count()
+        self.insert(
+            Group,
+            (
+                Group(
+                    title=self.text(1, 3),
+                    slug=f'{self.prefix}{number}',
+                    description=self.text(5, 20),
+                )
+                for number in range(start, start + total)
+            ),
+            'Группы',
+            total,
+        )
+        return list(Group.objects.filter(
+            slug__startswith=self.prefix
+        ).values_list('pk', flat=True))
+
+    def seed_posts(self, total, user_ids, popularity, group_ids):
+        step = timedelta(days=self.days) / max(total, 1)
+        start = self.now - timedelta(days=self.days)
+        # Даты публикации распределены по прошлому, а не равны моменту
+        # вставки, поэтому auto_now_add на время наполнения отключается.
+        with keep_dates(Post._meta.get_field('pub_date')):
+            self.insert(
+                Post,
+                (
+                    Post(
+                        text=self.text(5, 60),
+                        author_id=pick(self.rng, user_ids, popularity),
+                        group_id=(
+                            self.rng.choice(group_ids)
+                            if group_ids and self.rng.random() < 0.7
+                            else None
+                        ),
+                        pub_date=start + step * number,
+                    )
+                    for number in range(total)
+                ),
+                'Посты',
+                total,
+            )
+        return list(Post.objects.filter(
+            author_id__in=user_ids
+        ).order_by('-pub_date', '-pk').values_list('pk', flat=True))
+
+    def seed_comments(self, total, user_ids, post_ids, popularity):
+        if not post_ids:
+            return
+        self.insert(
+            Comment,
+            (
+                Comment(
+                    text=self.text(2, 30),
+                    author_id=self.rng.choice(user_ids),
+                    post_id=pick(self.rng, post_ids, popularity),
+                )
+                for _ in range(total)
+            ),
+            'Комментарии',
+            total,
+        )
+
+    def seed_follows(self, average, user_ids, popularity):
+        total = average * len(user_ids)
+
+        def follows():
+            for user_id in user_ids:
+                wanted = min(
+                    int(self.rng.expovariate(1 / average)) if average else 0,
+                    len(user_ids) - 1,
+                )
+                authors = set()
+                for _ in range(wanted * 2):
+                    if len(authors) >= wanted:
+                        break
+                    author_id = pick(self.rng, user_ids, popularity)
+                    if author_id != user_id:
+                        authors.add(author_id)
+                for author_id in sorted(authors):
+                    yield Follow(user_id=user_id, author_id=author_id)
+
+        self.insert(Follow, follows(), 'Подписки', total)
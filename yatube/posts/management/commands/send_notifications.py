@@ -0,0 +1,121 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Value
+from django.db.models.functions import Concat
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from posts import notifications
+from posts.models import Notification
+
+User = get_user_model()
+
+LOCMEM_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Отправляет накопившиеся уведомления дайджестами, по письму на '
+        'получателя, и печатает пропускную способность. С --bench '
+        'сравнивает дайджесты с письмом на каждое событие'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Сколько событий отправлять за одну пачку',
+        )
+        parser.add_argument(
+            '--purge', type=int, metavar='SECONDS',
+            help='Удалить отправленные события старше SECONDS секунд',
+        )
+        parser.add_argument(
+            '--bench', type=int, default=0, metavar='N',
+            help='Сгенерировать N событий и сравнить способы отправки; '
+                 'изменения откатываются',
+        )
+        parser.add_argument(
+            '--backend', default=LOCMEM_BACKEND,
+            help='Почтовый backend для замера',
+        )
+
+    def handle(self, *args, **options):
+        if options['bench']:
+            with override_settings(EMAIL_BACKEND=options['backend']):
+                self.bench(options['bench'], options['batch_size'])
+            return
+        result = notifications.send_digests(options['batch_size'])
+        self.report('Дайджесты', result)
+        if options['purge'] is not None:
+            deleted = notifications.purge(options['purge'])
+            self.stdout.write(f'Удалено событий: {deleted}')
+
+    def report(self, title, result):
+        seconds = result['seconds'] or 1e-9
+        self.stdout.write(
+            f'{title}: событий {result["events"]}, получателей '
+            f'{result["recipients"]}, писем {result["messages"]}, '
+            f'соединений {result["connections"]} за '
+            f'{seconds:.2f} с, {result["events"] / seconds:.0f} событий/с, '
+            f'{result["messages"] / seconds:.0f} писем/с'
+        )
+
+    def bench(self, count, batch_size):
+        users = list(User.objects.values_list('pk', flat=True)[:1000])
+        if len(users) < 2:
+            raise CommandError('Нужны хотя бы два пользователя')
+        try:
+            with transaction.atomic():
+                User.objects.filter(pk__in=users, email='').update(
+                    email=Concat('username', Value('@example.com'))
+                )
+                # Настоящие неотправленные события в замер не попадают.
+                Notification.objects.filter(sent__isnull=True).update(
+                    sent=timezone.now()
+                )
+                Notification.objects.bulk_create(
+                    Notification(
+                        recipient_id=random.choice(users),
+                        actor_id=random.choice(users),
+                        kind=Notification.FOLLOW,
+                    )
+                    for _ in range(count)
+                )
+                self.report('По письму на событие', self.one_by_one())
+                self.report(
+                    'Дайджесты', notifications.send_digests(batch_size)
+                )
+                raise Rollback
+        except Rollback:
+            pass
+
+    def one_by_one(self):
+        """Так отправлялись бы письма без дайджестов: отдельное письмо и
+        отдельное соединение на каждое событие."""
+        started = time.perf_counter()
+        events = Notification.objects.filter(
+            sent__isnull=True
+        ).select_related('recipient', 'actor')
+        sent = 0
+        for event in events:
+            sent += get_connection().send_messages([EmailMessage(
+                'Yatube: новый подписчик',
+                f'На вас подписался {event.actor.username}',
+                to=[event.recipient.email],
+            )]) or 0
+        return {
+            'events': len(events),
+            'recipients': len({event.recipient_id for event in events}),
+            'messages': sent,
+            'connections': len(events),
+            'seconds': time.perf_counter() - started,
+        }
@@ -0,0 +1,71 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def _init_worker():
+    django.setup()
+
+
+def _generate(name):
+    try:
+        thumbnails.generate(name)
+    except Exception as error:
+        return name, str(error)
+    return name, None
+
+
+class Command(BaseCommand):
+    help = 'Генерирует недостающие миниатюры постов на всех ядрах'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Число процессов; 0 - генерировать в текущем процессе',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Перегенерировать и уже готовые миниатюры',
+        )
+        parser.add_argument('--chunk-size', type=int, default=16)
+
+    def handle(self, *args, **options):
+        images = Post.objects.exclude(image='').values_list(
+            'image', flat=True
+        ).distinct()
+        names = [
+            name for name in images.iterator()
+            if options['force'] or not all(
+                thumbnails.is_ready(name, preset)
+                for preset in thumbnails.PRESETS
+            )
+        ]
+        self.stdout.write(f'Картинок без миниатюр: {len(names)}')
+        started = time.perf_counter()
+        if options['workers']:
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=options['workers'], initializer=_init_worker
+            ) as pool:
+                results = list(pool.map(
+                    _generate, names, chunksize=options['chunk_size']
+                ))
+        else:
+            results = [_generate(name) for name in names]
+        elapsed = time.perf_counter() - started
+        failed = [(name, error) for name, error in results if error]
+        for name, error in failed:
+            self.stderr.write(f'{name}: {error}')
+        done = len(results) - len(failed)
+        rate = done / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {done}, ошибок: {len(failed)}, '
+            f'{elapsed:.1f} с, {rate:.1f} картинок/с'
+        ))
@@ -0,0 +1,94 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from . import thumbnails
+from .models import MediaFile, Post
+from .storage import is_hashed
+
+
+def _storage():
+    return Post._meta.get_field('image').storage
+
+
+def _size(name):
+    try:
+        return _storage().size(name)
+    except OSError:
+        return 0
+
+
+def acquire(name):
+    """Учитывает ещё один пост, который ссылается на файл.
+
+    Считаются только файлы, сохранённые по хешу: старые имена никто,
+    кроме своего поста, не использует, их переносит dedupe_media.
+    """
+    if not name or not is_hashed(name):
+        return
+    MediaFile.objects.bulk_create(
+        [MediaFile(name=name, size=_size(name))], ignore_conflicts=True
+    )
+    MediaFile.objects.filter(name=name).update(refs=F('refs') + 1)
+    # Отметку повторной загрузки заменяет ссылка, но collect увидит её
+    # только после коммита.
+    transaction.on_commit(lambda: _storage().unpin(name))
+
+
+def release(name):
+    """Снимает ссылку поста; файл без ссылок удаляется после коммита."""
+    if not name or not is_hashed(name):
+        return
+    MediaFile.objects.filter(name=name).update(
+        refs=Greatest(F('refs') - 1, 0)
+    )
+    transaction.on_commit(lambda: collect(name))
+
+
+def collect(name):
+    """Удаляет файл и его миниатюры, если на него не ссылается ни один
+    пост.
+
+    Ссылки перепроверяются под блокировкой хранилища: пока строка
+    удалялась, файл могли загрузить заново, и новый пост либо уже
+    закоммичен со ссылкой, либо ещё держит отметку хранилища.
+    """
+    deleted, _ = MediaFile.objects.filter(name=name, refs=0).delete()
+    if not deleted:
+        return False
+    storage = _storage()
+    with storage.lock():
+        if storage.is_pinned(name, settings.MEDIA_PIN_TIMEOUT) or (
+            MediaFile.objects.filter(name=name, refs__gt=0).exists()
+        ):
+            return False
+        thumbnails.delete(name)
+        storage.delete(name)
+        storage.unpin(name)
+    return True
+
+
+def recount():
+    """Пересобирает счётчики ссылок по картинкам постов."""
+    missing = (
+        Post.objects.exclude(image='')
+        .exclude(image__in=MediaFile.objects.values('name'))
+        .order_by().values_list('image', flat=True).distinct()
+    )
+    MediaFile.objects.bulk_create(
+        (
+            MediaFile(name=name, size=_size(name))
+            for name in missing if is_hashed(name)
+        ),
+        batch_size=500,
+    )
+    MediaFile.objects.update(refs=Coalesce(
+        Subquery(
+            Post.objects.filter(image=OuterRef('name'))
+            .order_by().values('image')
+            .annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    ))
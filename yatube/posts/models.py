@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 NUMBER_OF_CHAR_TEXT = 15
@@ -10,11 +12,17 @@ class Group(models.Model):
     title = models.CharField('title', max_length=200)
     slug = models.SlugField('slug', max_length=255, unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
 
     def __str__(self):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def with_related(self):
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст поста',
@@ -36,8 +44,15 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0
+    )
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self):
         return self.text[:NUMBER_OF_CHAR_TEXT]
@@ -45,6 +60,16 @@ class Post(models.Model):
     class Meta:
         ordering = ['-pub_date']
         default_related_name = '%(app_label)s'
+        indexes = [
+            models.Index(fields=['-pub_date', '-id']),
+            models.Index(fields=['author', '-pub_date', '-id']),
+            models.Index(fields=['group', '-pub_date', '-id']),
+        ]
+
+
+class CommentQuerySet(models.QuerySet):
+    def with_related(self):
+        return self.select_related('author')
 
 
 class Comment(models.Model):
@@ -63,9 +88,16 @@ class Comment(models.Model):
         verbose_name='время комментария')
     text = models.TextField()
 
+    objects = CommentQuerySet.as_manager()
+
     def __str__(self):
         return self.text[:NUMBER_OF_CHAR_TEXT]
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'created']),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -78,3 +110,95 @@ class Follow(models.Model):
         related_name='following',
         on_delete=models.CASCADE,
     )
+
+    class Meta:
+        unique_together = ('user', 'author')
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        related_name='stats',
+        on_delete=models.CASCADE,
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков',
+        default=0
+    )
+    following_count = models.PositiveIntegerField(
+        'Число подписок',
+        default=0
+    )
+
+    def __str__(self):
+        return str(self.user)
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        related_name='timeline',
+        on_delete=models.CASCADE,
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='timeline_entries',
+        on_delete=models.CASCADE,
+    )
+    author = models.ForeignKey(
+        User,
+        related_name='+',
+        on_delete=models.CASCADE,
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post']),
+        ]
+
+
+class Notification(models.Model):
+    COMMENT = 'comment'
+    FOLLOW = 'follow'
+    KINDS = (
+        (COMMENT, 'Комментарий'),
+        (FOLLOW, 'Подписка'),
+    )
+
+    recipient = models.ForeignKey(
+        User,
+        related_name='notifications',
+        on_delete=models.CASCADE,
+    )
+    actor = models.ForeignKey(
+        User,
+        related_name='+',
+        on_delete=models.CASCADE,
+    )
+    kind = models.CharField('Событие', max_length=10, choices=KINDS)
+    post = models.ForeignKey(
+        Post,
+        related_name='+',
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+    )
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    sent = models.DateTimeField('Отправлено', blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sent', 'recipient']),
+        ]
+
+
+class MediaFile(models.Model):
+    name = models.CharField('Файл', max_length=255, unique=True)
+    size = models.BigIntegerField('Размер, байт', default=0)
+    refs = models.PositiveIntegerField('Число постов с файлом', default=0)
+
+    def __str__(self):
+        return self.name
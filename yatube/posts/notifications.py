@@ -0,0 +1,119 @@
+import time
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.template.loader import get_template
+from django.utils import timezone
+
+from core import jobs
+
+from .models import Notification
+
+DIGEST_KEY = 'notifications:digest'
+
+
+def record(recipient_id, actor_id, kind, post_id=None):
+    """Запоминает событие для дайджеста и планирует его отправку.
+
+    Письмо уходит не сразу: события копятся до
+    ``NOTIFICATION_DIGEST_INTERVAL`` и отправляются одним письмом на
+    получателя.
+    """
+    if recipient_id == actor_id:
+        return
+    Notification.objects.create(
+        recipient_id=recipient_id,
+        actor_id=actor_id,
+        kind=kind,
+        post_id=post_id,
+    )
+    jobs.enqueue(
+        send_digests,
+        key=DIGEST_KEY,
+        delay=settings.NOTIFICATION_DIGEST_INTERVAL,
+    )
+
+
+def _pending(limit):
+    queryset = (
+        Notification.objects.filter(sent__isnull=True)
+        .select_related('recipient', 'actor', 'post')
+        .order_by('recipient_id', 'created', 'pk')
+    )
+    if connection.features.has_select_for_update_skip_locked:
+        queryset = queryset.select_for_update(skip_locked=True, of=('self',))
+    return list(queryset[:limit])
+
+
+def _digest(templates, recipient, events):
+    context = {
+        'recipient': recipient,
+        'comments': [
+            event for event in events if event.kind == Notification.COMMENT
+        ],
+        'followers': [
+            event.actor for event in events
+            if event.kind == Notification.FOLLOW
+        ],
+        'site_url': settings.SITE_URL,
+    }
+    subject, body = templates
+    return EmailMessage(
+        subject.render(context).strip(),
+        body.render(context),
+        to=[recipient.email],
+    )
+
+
+@jobs.task
+def send_digests(batch_size=None):
+    """Отправляет накопившиеся события дайджестами через одно соединение.
+
+    Возвращает число получателей, событий, писем и затраченное время.
+    События пачки помечаются отправленными только после отправки, так что
+    при ошибке почты задача повторит их.
+    """
+    batch_size = batch_size or settings.NOTIFICATION_BATCH_SIZE
+    started = time.perf_counter()
+    result = {'recipients': 0, 'events': 0, 'messages': 0, 'connections': 1}
+    templates = (
+        get_template('notifications/digest_subject.txt'),
+        get_template('notifications/digest.txt'),
+    )
+    with get_connection() as mail:
+        while True:
+            with transaction.atomic():
+                events = _pending(batch_size)
+                if not events:
+                    break
+                if len(events) == batch_size:
+                    # Последний получатель мог не поместиться в пачку
+                    # целиком, его события дождутся следующей.
+                    tail = events[-1].recipient_id
+                    events = [
+                        event for event in events
+                        if event.recipient_id != tail
+                    ] or events
+                messages = []
+                for _, group in groupby(events, lambda e: e.recipient_id):
+                    group = list(group)
+                    recipient = group[0].recipient
+                    result['recipients'] += 1
+                    result['events'] += len(group)
+                    if recipient.email:
+                        messages.append(_digest(templates, recipient, group))
+                result['messages'] += mail.send_messages(messages) or 0
+                Notification.objects.filter(
+                    pk__in=[event.pk for event in events]
+                ).update(sent=timezone.now())
+    result['seconds'] = time.perf_counter() - started
+    return result
+
+
+def purge(older_than):
+    """Удаляет отправленные события старше ``older_than`` секунд."""
+    deadline = timezone.now() - timedelta(seconds=older_than)
+    return Notification.objects.filter(sent__lt=deadline).delete()[0]
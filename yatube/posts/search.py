@@ -0,0 +1,170 @@
+import base64
+import json
+import re
+
+from django.db import connection
+
+from core import jobs
+
+from .models import Post
+from .utils import FEED_ORDERING
+
+FTS_TABLE = 'posts_post_fts'
+TSVECTOR_TABLE = 'posts_post_search'
+TSVECTOR_CONFIG = 'russian'
+
+WORD = re.compile(r'\w+')
+
+# Ранг приведён к виду «меньше - релевантнее» для обеих баз,
+# чтобы курсор и сортировка не зависели от бэкенда.
+RANKED_SQL = {
+    'sqlite': (
+        f'SELECT p.id AS id, bm25({FTS_TABLE}) AS rank '
+        f'FROM {FTS_TABLE} JOIN posts_post p ON p.id = {FTS_TABLE}.rowid '
+        f'WHERE {FTS_TABLE} MATCH %s'
+    ),
+    'postgresql': (
+        f'SELECT p.id AS id, -ts_rank(s.document, q) AS rank '
+        f'FROM {TSVECTOR_TABLE} s JOIN posts_post p ON p.id = s.post_id, '
+        f"plainto_tsquery('{TSVECTOR_CONFIG}', %s) q "
+        f'WHERE s.document @@ q'
+    ),
+}
+
+
+def backend():
+    """Какой индекс доступен: ``sqlite`` (FTS5), ``postgresql`` или None."""
+    return connection.vendor if connection.vendor in RANKED_SQL else None
+
+
+def _match(query):
+    if connection.vendor == 'sqlite':
+        # Каждое слово в кавычках: спецсимволы FTS5 из запроса
+        # пользователя не превращаются в операторы.
+        return ' '.join(f'"{word}"' for word in WORD.findall(query))
+    return query
+
+
+def index(post_id, text):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [post_id, text],
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                f'INSERT INTO {TSVECTOR_TABLE} (post_id, document) '
+                f"VALUES (%s, to_tsvector('{TSVECTOR_CONFIG}', %s)) "
+                'ON CONFLICT (post_id) DO UPDATE '
+                'SET document = EXCLUDED.document',
+                [post_id, text],
+            )
+
+
+def unindex(post_id):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                f'DELETE FROM {TSVECTOR_TABLE} WHERE post_id = %s',
+                [post_id],
+            )
+
+
+@jobs.task
+def reindex(post_id):
+    """Приводит запись индекса к текущему тексту поста."""
+    text = Post.objects.filter(pk=post_id).values_list(
+        'text', flat=True
+    ).first()
+    if text is None:
+        unindex(post_id)
+    else:
+        index(post_id, text)
+
+
+def rebuild():
+    """Заново строит индекс по всем постам одним запросом."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                'SELECT id, text FROM posts_post'
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(f'TRUNCATE {TSVECTOR_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {TSVECTOR_TABLE} (post_id, document) '
+                f"SELECT id, to_tsvector('{TSVECTOR_CONFIG}', text) "
+                'FROM posts_post'
+            )
+
+
+def encode_cursor(rank, post_id):
+    raw = json.dumps([rank, post_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        rank, post_id = json.loads(base64.urlsafe_b64decode(padded))
+        return float(rank), int(post_id)
+    except Exception:
+        return None
+
+
+def ranked_ids(query, limit, group_id=None, author_id=None, after=None):
+    """Пары ``(rank, id)`` лучших совпадений, начиная сразу за ``after``."""
+    match = _match(query)
+    if backend() is None or not match:
+        return []
+    sql = RANKED_SQL[connection.vendor]
+    params = [match]
+    if group_id is not None:
+        sql += ' AND p.group_id = %s'
+        params.append(group_id)
+    if author_id is not None:
+        sql += ' AND p.author_id = %s'
+        params.append(author_id)
+    sql = f'SELECT rank, id FROM ({sql}) ranked'
+    if after is not None:
+        sql += ' WHERE rank > %s OR (rank = %s AND id > %s)'
+        params += [after[0], after[0], after[1]]
+    sql += ' ORDER BY rank, id LIMIT %s'
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def like_scan(query, limit, group_id=None, author_id=None):
+    """Поиск перебором через LIKE, если полнотекстового индекса нет."""
+    posts = Post.objects.with_related().filter(text__icontains=query)
+    if group_id is not None:
+        posts = posts.filter(group_id=group_id)
+    if author_id is not None:
+        posts = posts.filter(author_id=author_id)
+    return list(posts.order_by(*FEED_ORDERING)[:limit])
+
+
+def search(query, per_page, group_id=None, author_id=None, cursor=None):
+    """Страница результатов поиска и курсор следующей страницы."""
+    if backend() is None:
+        return like_scan(query, per_page, group_id, author_id), None
+    after = decode_cursor(cursor) if cursor else None
+    rows = ranked_ids(query, per_page + 1, group_id, author_id, after)
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(*rows[-1])
+    posts = Post.objects.with_related().in_bulk([pk for _, pk in rows])
+    return [posts[pk] for _, pk in rows if pk in posts], next_cursor
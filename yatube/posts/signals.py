@@ -0,0 +1,124 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import jobs
+from core.cache import bump
+
+from . import counters, follows, media, notifications, search, timeline
+from .models import (Comment, Follow, Group, Notification, Post,
+                     UserStats)
+
+User = get_user_model()
+
+
+def post_namespaces(post):
+    namespaces = ['index', f'profile:{post.author.username}',
+                  f'post:{post.pk}']
+    if post.group_id:
+        namespaces.append(f'group:{post.group.slug}')
+    if getattr(post, '_previous_group_slug', None):
+        namespaces.append(f'group:{post._previous_group_slug}')
+    return namespaces
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+        # id мог достаться от удалённого пользователя вместе с его
+        # подписками в кеше.
+        follows.forget(instance.pk)
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_state(sender, instance, **kwargs):
+    instance._previous_group_id = None
+    instance._previous_group_slug = None
+    instance._previous_image = ''
+    if instance.pk:
+        (
+            instance._previous_group_id,
+            instance._previous_group_slug,
+            instance._previous_image,
+        ) = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group_id', 'group__slug', 'image')
+            .first() or (None, None, '')
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.shift_user(instance.author_id, posts_count=1)
+        counters.shift_group(instance.group_id, 1)
+        media.acquire(instance.image.name)
+        jobs.enqueue(
+            timeline.fan_out_post, instance.pk, key=f'fan_out:{instance.pk}'
+        )
+    else:
+        if instance._previous_group_id != instance.group_id:
+            counters.shift_group(instance._previous_group_id, -1)
+            counters.shift_group(instance.group_id, 1)
+        if instance._previous_image != (instance.image.name or ''):
+            media.acquire(instance.image.name)
+            media.release(instance._previous_image)
+    jobs.enqueue(search.reindex, instance.pk, key=f'search:{instance.pk}')
+    bump(*post_namespaces(instance))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.shift_user(instance.author_id, posts_count=-1)
+    counters.shift_group(instance.group_id, -1)
+    media.release(instance.image.name)
+    search.unindex(instance.pk)
+    bump(*post_namespaces(instance))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    bump('index', f'group:{instance.slug}')
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.shift_post(instance.post_id, 1)
+        notifications.record(
+            instance.post.author_id, instance.author_id,
+            Notification.COMMENT, instance.post_id,
+        )
+    bump(f'post:{instance.post_id}')
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.shift_post(instance.post_id, -1)
+    bump(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.shift_user(instance.author_id, followers_count=1)
+        counters.shift_user(instance.user_id, following_count=1)
+        timeline.followers_changed(instance.author_id, 1)
+        timeline.backfill(instance.user_id, instance.author_id)
+        notifications.record(
+            instance.author_id, instance.user_id, Notification.FOLLOW
+        )
+    follows.forget(instance.user_id)
+    bump(f'profile:{instance.author.username}')
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.shift_user(instance.author_id, followers_count=-1)
+    counters.shift_user(instance.user_id, following_count=-1)
+    timeline.followers_changed(instance.author_id, -1)
+    timeline.trim(instance.user_id, instance.author_id)
+    follows.forget(instance.user_id)
+    bump(f'profile:{instance.author.username}')
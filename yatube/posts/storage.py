@@ -0,0 +1,116 @@
+import hashlib
+import os
+import re
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.core.files import locks
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASHED_NAME = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$')
+
+
+def hashed_name(directory, digest, ext):
+    return '/'.join(filter(None, [directory, digest[:2], digest + ext]))
+
+
+def is_hashed(name):
+    return bool(HASHED_NAME.search(name))
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файлы под SHA-256 содержимого: одинаковые картинки лежат на
+    диске один раз, и миниатюры sorl у них тоже общие.
+
+    Загрузка пишется во временный файл по частям, хеш считается на лету,
+    так что файл целиком в памяти не держится.
+
+    Если такой файл уже есть, загрузка отбрасывается, а файл помечается:
+    ссылку на него пост возьмёт только при сохранении, и до коммита
+    media.collect не должен удалить файл как никому не нужный.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Итоговое имя выберет _save, и одинаковое содержимое должно
+        # попадать в один и тот же файл.
+        return name
+
+    def digest(self, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def content_name(self, name, content):
+        """Имя, под которым содержимое окажется в хранилище."""
+        directory, basename = os.path.split(name)
+        ext = os.path.splitext(basename)[1].lower()
+        return hashed_name(directory, self.digest(content), ext)
+
+    def _save(self, name, content):
+        directory, basename = os.path.split(name)
+        ext = os.path.splitext(basename)[1].lower()
+        os.makedirs(self.path(directory), exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temp = tempfile.mkstemp(
+            dir=self.path(directory), prefix='.upload-'
+        )
+        try:
+            with os.fdopen(fd, 'wb') as output:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    output.write(chunk)
+            name = hashed_name(directory, digest.hexdigest(), ext)
+            path = self.path(name)
+            with self.lock():
+                if os.path.exists(path):
+                    self.pin(name)
+                    os.remove(temp)
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.chmod(temp, self.file_permissions_mode or 0o644)
+                    os.replace(temp, path)
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+        return name
+
+    @contextmanager
+    def lock(self):
+        """Блокировка между повторным использованием файла и его удалением,
+        общая для всех процессов с этим хранилищем."""
+        os.makedirs(self.location, exist_ok=True)
+        with open(os.path.join(self.location, '.lock'), 'a') as lock_file:
+            locks.lock(lock_file, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lock_file)
+
+    def _pin_path(self, name):
+        directory, basename = os.path.split(self.path(name))
+        return os.path.join(directory, f'.{basename}.pin')
+
+    def pin(self, name):
+        with open(self._pin_path(name), 'w'):
+            pass
+
+    def unpin(self, name):
+        try:
+            os.remove(self._pin_path(name))
+        except FileNotFoundError:
+            pass
+
+    def is_pinned(self, name, timeout):
+        """Файл повторно загружен не раньше ``timeout`` секунд назад, и
+        пост с ним ещё не закоммичен. Отметки старше - от откаченных
+        транзакций, их не учитываем."""
+        try:
+            pinned = os.path.getmtime(self._pin_path(name))
+        except FileNotFoundError:
+            return False
+        return time.time() - pinned < timeout
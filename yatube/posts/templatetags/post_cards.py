@@ -0,0 +1,15 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts.cards import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts, show_author=True, show_group=True):
+    """Закешированные карточки постов страницы в виде списка HTML."""
+    return [
+        mark_safe(card)
+        for card in render_cards(posts, show_author, show_group)
+    ]
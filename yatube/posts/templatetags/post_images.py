@@ -0,0 +1,48 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+def _fallback_url(image):
+    if settings.THUMBNAIL_PLACEHOLDER:
+        return static(settings.THUMBNAIL_PLACEHOLDER)
+    return image.url
+
+
+@register.inclusion_tag('includes/picture.html')
+def post_picture(image, sizes='100vw', loading='', preset='card',
+                 ready=None):
+    """<picture> с вариантами миниатюры по ширинам и форматам.
+
+    Браузер сам выбирает формат из <source> и ширину из srcset под экран.
+    Тег только читает готовые варианты, а вместо недостающих отдаёт
+    запасную картинку: генерацию ставят сохранение формы и
+    warm_thumbnails. ``ready`` - уже прочитанные thumbnails.ready_many
+    варианты.
+    """
+    if not image:
+        return {}
+    if ready is None:
+        ready = thumbnails.ready_variants(image, preset)
+    srcsets = {}
+    for variant, thumbnail in ready:
+        if thumbnail is not None:
+            srcsets.setdefault(variant.mime, []).append(
+                f'{thumbnail.url} {variant.width}w'
+            )
+    jpeg = srcsets.pop('image/jpeg', [])
+    return {
+        'image': image,
+        'sources': [
+            {'type': mime, 'srcset': ', '.join(candidates)}
+            for mime, candidates in srcsets.items()
+        ],
+        'src': jpeg[-1].rsplit(' ', 1)[0] if jpeg else _fallback_url(image),
+        'srcset': ', '.join(jpeg),
+        'sizes': sizes,
+        'loading': loading,
+    }
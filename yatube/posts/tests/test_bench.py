@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ..counters import find_drift
+from ..models import Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class SeedBenchTests(TestCase):
+    def seed(self, seed=1):
+        call_command(
+            'seed_bench', users=30, groups=3, posts=200, comments=100,
+            follows=5, seed=seed, prefix=f'seed{seed}_', stdout=StringIO(),
+        )
+        return list(
+            Post.objects.filter(author__username__startswith=f'seed{seed}_')
+            .order_by('pk').values_list('author__username', 'text')
+        )
+
+    def test_seed_bench(self):
+        """Набор данных создаётся целиком и с согласованными счётчиками"""
+        self.seed()
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertLess(
+            Post.objects.earliest('pub_date').pub_date,
+            timezone.now() - timezone.timedelta(days=300),
+        )
+        self.assertEqual(list(find_drift()), [])
+
+    def test_seed_is_reproducible(self):
+        """Одинаковый seed даёт одинаковые данные"""
+        first = self.seed()
+        Post.objects.all().delete()
+        User.objects.all().delete()
+        second = self.seed()
+        self.assertEqual(
+            [(name.split('_')[-1], text) for name, text in first],
+            [(name.split('_')[-1], text) for name, text in second],
+        )
+
+    def test_bench_views(self):
+        """Замер проходит по всем страницам и пишет историю прогонов"""
+        self.seed()
+        cache.clear()
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            history = os.path.join(directory, 'history.jsonl')
+            for _ in range(2):
+                call_command(
+                    'bench_views', requests=3, history=history, stdout=out,
+                )
+            with open(history) as lines:
+                runs = [json.loads(line) for line in lines]
+        self.assertEqual(len(runs), 2)
+        self.assertEqual(
+            set(runs[-1]['results']),
+            {'index', 'group_posts', 'profile', 'post_detail',
+             'follow_index', 'add_comment'},
+        )
+        self.assertIn('p95 ', out.getvalue())
@@ -0,0 +1,90 @@
+from unittest import mock
+
+from django.contrib.auth import (BACKEND_SESSION_KEY, authenticate,
+                                 get_user_model)
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from users.backends import CachedModelBackend
+
+from ..follows import following_ids
+from ..models import Follow, Post
+
+User = get_user_model()
+
+
+class CachedAuthTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_session_and_user_come_from_cache(self):
+        """Повторный запрос не читает сессию и пользователя из базы"""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        tables = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('django_session', tables)
+        self.assertNotIn(f'"auth_user"."id" = {self.user.pk}', tables)
+
+    def test_user_cache_reset_on_save(self):
+        """Изменённый пользователь не отдаётся из кеша"""
+        backend = CachedModelBackend()
+        self.assertEqual(backend.get_user(self.user.pk).first_name, '')
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Имя'
+        user.save()
+        self.assertEqual(backend.get_user(self.user.pk).first_name, 'Имя')
+
+    def test_inactive_user_rejected(self):
+        """Заблокированный пользователь не проходит даже из кеша"""
+        backend = CachedModelBackend()
+        backend.get_user(self.user.pk)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        cache.set(f'user:{self.user.pk}', User.objects.get(pk=self.user.pk))
+        self.assertIsNone(backend.get_user(self.user.pk))
+
+    def test_legacy_session_stays_logged_in(self):
+        """Сессия, открытая через ModelBackend, остаётся авторизованной"""
+        session = self.client.session
+        session[BACKEND_SESSION_KEY] = (
+            'django.contrib.auth.backends.ModelBackend'
+        )
+        session.save()
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['user'], self.user)
+        self.assertEqual(
+            self.client.session[BACKEND_SESSION_KEY],
+            'users.backends.CachedModelBackend',
+        )
+
+    def test_failed_login_checks_password_once(self):
+        """Неверный пароль проверяется одним backend, а не двумя"""
+        with mock.patch.object(
+            User, 'check_password', autospec=True, return_value=False
+        ) as check_password:
+            self.assertIsNone(authenticate(username='reader', password='x'))
+        self.assertEqual(check_password.call_count, 1)
+
+    def test_following_reset_on_follow_and_unfollow(self):
+        """Множество подписок обновляется при подписке и отписке"""
+        self.assertEqual(following_ids(self.user.pk), frozenset())
+        self.client.get(reverse('posts:profile_follow', args=['auth']))
+        self.assertEqual(following_ids(self.user.pk), {self.author.pk})
+        response = self.client.get(reverse('posts:profile', args=['auth']))
+        self.assertTrue(response.context['following'])
+        self.client.get(reverse('posts:profile_unfollow', args=['auth']))
+        self.assertEqual(following_ids(self.user.pk), frozenset())
+        self.assertFalse(Follow.objects.exists())
@@ -0,0 +1,73 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from .. import cards
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class PostCardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Группа', slug='test-slug', description='Описание'
+        )
+        for number in range(3):
+            Post.objects.create(
+                author=cls.user, text=f'Пост {number}', group=cls.group
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def posts(self):
+        return list(Post.objects.with_related())
+
+    def render(self, posts):
+        with mock.patch.object(
+            cards, 'render_to_string', wraps=cards.render_to_string
+        ) as render:
+            html = cards.render_cards(posts)
+        return html, render.call_count
+
+    def test_cards_are_cached(self):
+        """Повторная страница собирается из кеша без рендера"""
+        first, rendered = self.render(self.posts())
+        self.assertEqual(rendered, 3)
+        second, rendered = self.render(self.posts())
+        self.assertEqual(rendered, 0)
+        self.assertEqual(first, second)
+
+    def test_changes_produce_new_card(self):
+        """Правка поста, автора или группы меняет карточку"""
+        self.render(self.posts())
+        post = Post.objects.first()
+        post.text = 'Исправленный текст'
+        post.save()
+        html, rendered = self.render(self.posts())
+        self.assertEqual(rendered, 1)
+        self.assertTrue(any('Исправленный текст' in card for card in html))
+        User.objects.filter(pk=self.user.pk).update(first_name='Иван')
+        html, rendered = self.render(self.posts())
+        self.assertEqual(rendered, 3)
+        self.assertIn('Иван', html[0])
+        Group.objects.filter(pk=self.group.pk).update(slug='renamed')
+        html, rendered = self.render(self.posts())
+        self.assertEqual(rendered, 3)
+        self.assertIn('/group/renamed/', html[0])
+
+    def test_card_without_thumbnail_is_not_cached(self):
+        """Карточка с запасной картинкой рендерится заново"""
+        Post.objects.filter(pk=Post.objects.first().pk).update(
+            image='posts/missing.gif'
+        )
+        with mock.patch('posts.thumbnails.schedule'), \
+                self.settings(JOBS_EAGER=False):
+            self.render(self.posts())
+            _, rendered = self.render(self.posts())
+        self.assertEqual(rendered, 1)
@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentsPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.author, text='Тестовый пост')
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post, author=cls.author, text=f'Комментарий {number}'
+            )
+            for number in range(5)
+        ]
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_post_detail_shows_first_page(self):
+        """На странице поста только первая порция комментариев"""
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.id,))
+        )
+        page = response.context['comments']
+        self.assertEqual(list(page), self.comments[:3])
+        self.assertIsNotNone(page.next_cursor)
+        self.assertContains(response, 'data-comments-more')
+
+    def test_fragment_next_page(self):
+        """Фрагмент по курсору отдаёт следующую порцию"""
+        url = reverse('posts:post_comments', args=(self.post.id,))
+        first = self.client.get(url).context['comments']
+        response = self.client.get(url, {'cursor': first.next_cursor})
+        self.assertTemplateUsed(response, 'includes/comments.html')
+        self.assertEqual(list(response.context['comments']), self.comments[3:])
+        self.assertNotContains(response, 'data-comments-more')
+
+    def test_newest_first_json(self):
+        """JSON-ответ с новыми комментариями сначала"""
+        url = reverse('posts:post_comments', args=(self.post.id,))
+        data = self.client.get(url, {'order': 'newest', 'format': 'json'})
+        data = data.json()
+        self.assertEqual(
+            [comment['text'] for comment in data['comments']],
+            ['Комментарий 4', 'Комментарий 3', 'Комментарий 2'],
+        )
+        data = self.client.get(url, {
+            'order': 'newest', 'format': 'json', 'cursor': data['next_cursor']
+        }).json()
+        self.assertEqual(
+            [comment['text'] for comment in data['comments']],
+            ['Комментарий 1', 'Комментарий 0'],
+        )
+        self.assertIsNone(data['next_cursor'])
+
+    def test_unknown_post(self):
+        """Комментарии несуществующего поста - 404"""
+        response = self.client.get(
+            reverse('posts:post_comments', args=(self.post.id + 100,))
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,106 @@
+import csv
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='test-slug', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Первый пост', group=cls.group
+        )
+        Comment.objects.create(post=cls.post, author=cls.reader, text='Ок')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def export(self, **options):
+        out = StringIO()
+        call_command('export_content', stdout=out, stderr=StringIO(),
+                     **options)
+        return out.getvalue()
+
+    def test_ndjson(self):
+        """Все типы выгружаются построчно в NDJSON"""
+        records = [
+            json.loads(line) for line in self.export().splitlines()
+        ]
+        self.assertEqual(
+            [record['type'] for record in records],
+            ['groups', 'posts', 'comments', 'follows'],
+        )
+        self.assertEqual(records[1]['author'], 'auth')
+        self.assertEqual(records[1]['group'], 'test-slug')
+        self.assertEqual(records[3]['user'], 'reader')
+
+    def test_incremental_state(self):
+        """С --state повторная выгрузка отдаёт только новые строки"""
+        with tempfile.TemporaryDirectory() as directory:
+            state = os.path.join(directory, 'state.json')
+            self.assertEqual(
+                len(self.export(types=['posts'], state=state).splitlines()),
+                1,
+            )
+            self.assertEqual(self.export(types=['posts'], state=state), '')
+            Post.objects.create(author=self.user, text='Второй пост')
+            lines = self.export(types=['posts'], state=state).splitlines()
+        self.assertEqual(json.loads(lines[0])['text'], 'Второй пост')
+
+    def test_csv(self):
+        """CSV содержит заголовок и строки таблицы"""
+        rows = list(csv.reader(
+            StringIO(self.export(types=['comments'], format='csv'))
+        ))
+        self.assertEqual(rows[0], ['id', 'post', 'author', 'created', 'text'])
+        self.assertEqual(rows[1][2:3] + rows[1][4:], ['reader', 'Ок'])
+
+    def test_endpoint_is_staff_only_and_streams(self):
+        """Выгрузка по HTTP доступна сотрудникам и идёт потоком"""
+        client = Client()
+        url = reverse('posts:export')
+        self.assertEqual(client.get(url).status_code, 302)
+        client.force_login(
+            User.objects.create_user(username='staff', is_staff=True)
+        )
+        response = client.get(url, {'type': 'posts', 'format': 'csv'})
+        self.assertTrue(response.streaming)
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('Первый пост', body)
+        response = client.get(url, {'type': 'posts', 'after_id': self.post.pk})
+        self.assertEqual(b''.join(response.streaming_content), b'')
+        self.assertEqual(client.get(url, {'type': 'x'}).status_code, 400)
+        response = client.get(url, {'since': '2024-02-30T00:00'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_endpoint_watermarks_per_type(self):
+        """Водяные знаки задаются для каждой таблицы отдельно"""
+        client = Client()
+        client.force_login(
+            User.objects.create_user(username='staff', is_staff=True)
+        )
+        url = reverse('posts:export')
+        response = client.get(
+            url, {'type': ['posts', 'comments'], 'after_id': self.post.pk}
+        )
+        self.assertEqual(response.status_code, 400)
+        response = client.get(url, {
+            'type': ['posts', 'comments'], 'after_posts': self.post.pk,
+        })
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line)['type'] for line in lines], ['comments']
+        )
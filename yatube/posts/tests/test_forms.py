@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -142,10 +143,11 @@ class PostCreateFormTests(TestCase):
             'posts:profile', kwargs={'username': self.user.username})
         )
         self.assertEqual(Post.objects.count(), tasks_count + 1)
+        digest = hashlib.sha256(small_gif).hexdigest()
         self.assertTrue(
             Post.objects.filter(
                 text='Изменение картинки',
-                image='posts/small.gif'
+                image=f'posts/{digest[:2]}/{digest}.gif'
             ).exists()
         )
 
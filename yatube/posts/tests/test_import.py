@@ -0,0 +1,139 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from .. import search
+from ..models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+class ImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='test-slug', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Первый пост', group=cls.group
+        )
+        Comment.objects.create(post=cls.post, author=cls.reader, text='Ок')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def export(self, name, **options):
+        path = os.path.join(self.directory, name)
+        call_command('export_content', output=path, stdout=StringIO(),
+                     stderr=StringIO(), **options)
+        return path
+
+    def load(self, *paths, **options):
+        out = StringIO()
+        self.err = StringIO()
+        call_command('import_content', *paths, stdout=out,
+                     stderr=self.err, **options)
+        return out.getvalue()
+
+    def wipe(self):
+        Follow.objects.all().delete()
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        User.objects.all().delete()
+
+    def test_ndjson_round_trip(self):
+        """Выгрузка NDJSON загружается обратно с теми же id и датами"""
+        path = self.export('content.ndjson')
+        # В JSON даты попадают с точностью до миллисекунд.
+        pub_date = self.post.pub_date.replace(
+            microsecond=self.post.pub_date.microsecond // 1000 * 1000
+        )
+        self.wipe()
+        output = self.load(path, batch_size=1, transaction_size=2)
+        self.assertIn('строк/с', output)
+        post = Post.objects.select_related('author', 'group').get()
+        self.assertEqual(post.pk, self.post.pk)
+        self.assertEqual(post.pub_date, pub_date)
+        self.assertEqual(post.author.username, 'auth')
+        self.assertEqual(post.group.slug, 'test-slug')
+        self.assertEqual(post.comments.get().author.username, 'reader')
+        self.assertTrue(Follow.objects.filter(
+            user__username='reader', author__username='auth'
+        ).exists())
+
+    def test_csv(self):
+        """CSV загружается по типу из имени файла"""
+        directory = self.export('csv', format='csv')
+        self.wipe()
+        self.load(*(
+            os.path.join(directory, f'{kind}.csv')
+            for kind in ('groups', 'posts', 'comments', 'follows')
+        ))
+        self.assertEqual(Post.objects.get().text, 'Первый пост')
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_rebuilds_counters_and_search(self):
+        """После загрузки счётчики и поиск соответствуют данным"""
+        path = self.export('content.ndjson')
+        self.wipe()
+        self.load(path, drop_indexes=True)
+        author = User.objects.get(username='auth')
+        self.assertEqual(UserStats.objects.get(user=author).posts_count, 1)
+        posts, _ = search.search('первый', per_page=10)
+        self.assertEqual([post.pk for post in posts], [self.post.pk])
+
+    def test_rerun_is_idempotent(self):
+        """Повторная загрузка не создаёт дублей"""
+        path = self.export('content.ndjson')
+        self.load(path)
+        self.load(path)
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(User.objects.count(), 2)
+
+    def test_skipped_rows_are_not_counted(self):
+        """Строки с занятыми id не считаются загруженными"""
+        path = self.export('content.ndjson')
+        output = self.load(path, skip_rebuild=True)
+        self.assertIn('Загружено строк: 0', output)
+        self.assertIn('posts: 1', self.err.getvalue())
+        Comment.objects.all().delete()
+        output = self.load(path, skip_rebuild=True)
+        self.assertIn('Загружено строк: 1', output)
+        self.assertNotIn('comments', self.err.getvalue())
+
+    def test_overlapping_ids_stop_before_writing(self):
+        """Чужие строки под теми же id останавливают загрузку до записи"""
+        path = self.export('content.ndjson')
+        Follow.objects.all().delete()
+        Comment.objects.all().delete()
+        Post.objects.filter(pk=self.post.pk).update(text='Другой пост')
+        message = f'posts: id {self.post.pk}'
+        with self.assertRaisesMessage(CommandError, message):
+            self.load(path, skip_rebuild=True)
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+
+    def test_comment_without_post_stops_import(self):
+        """Комментарий к посту, которого нет ни в базе, ни в выгрузке"""
+        path = self.export('content.ndjson', types=['comments'])
+        Post.objects.all().delete()
+        with self.assertRaisesMessage(CommandError, 'нет постов'):
+            self.load(path, skip_rebuild=True)
+        # stdin не перечитать, он проверяется пачками перед записью.
+        with open(path) as source, mock.patch('sys.stdin', source):
+            with self.assertRaisesMessage(CommandError, 'нет постов'):
+                self.load('-', skip_rebuild=True)
+        self.assertFalse(Comment.objects.exists())
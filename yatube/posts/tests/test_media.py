@@ -0,0 +1,189 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from PIL import Image
+from sorl.thumbnail import default
+
+from .. import media, thumbnails
+from ..models import MediaFile, Post
+from ..storage import is_hashed
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+def image_bytes(color='red'):
+    buffer = BytesIO()
+    Image.new('RGB', (40, 20), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def upload(color='red', name='meme.png'):
+    return SimpleUploadedFile(name, image_bytes(color), 'image/png')
+
+
+def storage():
+    return Post._meta.get_field('image').storage
+
+
+def files():
+    found = []
+    for root, _, names in os.walk(os.path.join(TEMP_MEDIA_ROOT, 'posts')):
+        found.extend(name for name in names if not name.startswith('.'))
+    return found
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        default.kvstore.clear()
+        self.user = User.objects.create_user(username='auth')
+
+    def test_identical_uploads_share_file(self):
+        """Одинаковые картинки хранятся одним файлом с двумя ссылками"""
+        first = Post.objects.create(
+            author=self.user, text='Раз', image=upload(name='a.png')
+        )
+        second = Post.objects.create(
+            author=self.user, text='Два', image=upload(name='b.png')
+        )
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(is_hashed(first.image.name))
+        self.assertEqual(len(files()), 1)
+        self.assertEqual(MediaFile.objects.get().refs, 2)
+
+    def test_different_uploads_get_own_files(self):
+        """Разное содержимое не склеивается даже при одинаковом имени"""
+        first = Post.objects.create(
+            author=self.user, text='Раз', image=upload('red')
+        )
+        second = Post.objects.create(
+            author=self.user, text='Два', image=upload('blue')
+        )
+        self.assertNotEqual(first.image.name, second.image.name)
+        self.assertEqual(len(files()), 2)
+
+    def test_thumbnails_are_shared(self):
+        """Миниатюра одинаковой картинки генерируется один раз"""
+        first = Post.objects.create(
+            author=self.user, text='Раз', image=upload()
+        )
+        thumbnails.generate(first.image.name)
+        second = Post.objects.create(
+            author=self.user, text='Два', image=upload()
+        )
+        self.assertIsNotNone(thumbnails.ready_thumbnail(second.image, 'card'))
+
+    def test_refs_follow_post_changes(self):
+        """Смена и удаление картинки уменьшают число ссылок"""
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=upload('red')
+        )
+        old = post.image.name
+        post.image = upload('blue')
+        post.save()
+        self.assertEqual(MediaFile.objects.get(name=old).refs, 0)
+        self.assertEqual(MediaFile.objects.get(name=post.image.name).refs, 1)
+        post.delete()
+        self.assertFalse(MediaFile.objects.filter(refs__gt=0).exists())
+
+    def test_collect_keeps_referenced_files(self):
+        """Файл удаляется только когда на него больше никто не ссылается"""
+        first = Post.objects.create(
+            author=self.user, text='Раз', image=upload()
+        )
+        Post.objects.create(author=self.user, text='Два', image=upload())
+        name = first.image.name
+        first.delete()
+        self.assertFalse(media.collect(name))
+        self.assertTrue(storage().exists(name))
+        # TestCase не коммитит, поэтому отметку второй загрузки снимаем
+        # сами, как это сделал бы коммит.
+        storage().unpin(name)
+        Post.objects.all().delete()
+        self.assertTrue(media.collect(name))
+        self.assertFalse(storage().exists(name))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class DedupeMediaTests(TransactionTestCase):
+    def setUp(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        default.kvstore.clear()
+        self.user = User.objects.create_user(username='auth')
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def legacy_post(self, name, color):
+        path = os.path.join(TEMP_MEDIA_ROOT, 'posts', name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as legacy:
+            legacy.write(image_bytes(color))
+        return Post.objects.create(
+            author=self.user, text=name, image=f'posts/{name}'
+        )
+
+    def test_dedupe_media(self):
+        """Команда переносит старые файлы и схлопывает дубли"""
+        self.legacy_post('a.png', 'red')
+        self.legacy_post('a_x1y2.png', 'red')
+        self.legacy_post('b.png', 'blue')
+        out = StringIO()
+        call_command('dedupe_media', '--dry-run', stdout=out)
+        self.assertIn('Будет перенесено файлов: 3, уникальных: 2',
+                      out.getvalue())
+        self.assertEqual(len(files()), 3)
+
+        call_command('dedupe_media', stdout=out)
+        names = set(Post.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 2)
+        self.assertTrue(all(is_hashed(name) for name in names))
+        self.assertEqual(len(files()), 2)
+        self.assertEqual(
+            sorted(MediaFile.objects.values_list('refs', flat=True)), [1, 2]
+        )
+
+    def test_unused_file_removed_after_commit(self):
+        """Файл без ссылок удаляется после коммита удаления поста"""
+        post = Post.objects.create(
+            author=self.user, text='Пост',
+            image=ContentFile(image_bytes(), name='pic.png'),
+        )
+        name = post.image.name
+        post.delete()
+        self.assertFalse(storage().exists(name))
+        self.assertFalse(MediaFile.objects.exists())
+
+    def test_reupload_survives_concurrent_collect(self):
+        """Файл, загруженный заново до коммита поста, collect не удаляет"""
+        first = Post.objects.create(
+            author=self.user, text='Раз',
+            image=ContentFile(image_bytes(), name='pic.png'),
+        )
+        name = first.image.name
+        # Загрузка уже отброшена как дубль, а ссылку пост ещё не взял.
+        self.assertEqual(
+            storage().save('posts/pic.png', ContentFile(image_bytes())), name
+        )
+        first.delete()
+        self.assertTrue(storage().exists(name))
+        second = Post.objects.create(author=self.user, text='Два', image=name)
+        self.assertEqual(MediaFile.objects.get(name=name).refs, 1)
+        second.delete()
+        self.assertFalse(storage().exists(name))
@@ -0,0 +1,126 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.models import Job
+
+from .. import notifications
+from ..models import Notification, Post
+
+User = get_user_model()
+
+
+@override_settings(JOBS_EAGER=False)
+class NotificationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='auth', email='auth@example.com'
+        )
+        cls.reader = User.objects.create_user(
+            username='reader', email='reader@example.com'
+        )
+        cls.silent = User.objects.create_user(username='silent')
+        cls.post = Post.objects.create(author=cls.author, text='Пост автора')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def comment(self, client, post):
+        client.post(
+            reverse('posts:add_comment', args=[post.pk]), {'text': 'Ого'}
+        )
+
+    def test_comment_and_follow_are_recorded(self):
+        """Комментарий и подписка копятся для дайджеста, а не шлются сразу"""
+        self.comment(self.client, self.post)
+        self.client.get(reverse('posts:profile_follow', args=['auth']))
+        self.assertEqual(
+            list(Notification.objects.values_list('recipient', 'kind')),
+            [(self.author.pk, Notification.COMMENT),
+             (self.author.pk, Notification.FOLLOW)],
+        )
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(
+            Job.objects.filter(key=notifications.DIGEST_KEY).count(), 1
+        )
+
+    def test_own_actions_are_not_recorded(self):
+        """О своих действиях не уведомляем"""
+        client = Client()
+        client.force_login(self.author)
+        self.comment(client, self.post)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_events_coalesce_per_recipient(self):
+        """Все события получателя уходят одним письмом"""
+        self.comment(self.client, self.post)
+        self.comment(self.client, self.post)
+        self.client.get(reverse('posts:profile_follow', args=['auth']))
+        other = Post.objects.create(author=self.silent, text='Пост')
+        self.comment(self.client, other)
+        result = notifications.send_digests()
+        self.assertEqual(len(mail.outbox), 1)
+        message = mail.outbox[0]
+        self.assertEqual(message.to, ['auth@example.com'])
+        self.assertIn('комментариев — 2', message.subject)
+        self.assertIn('reader', message.body)
+        self.assertIn(f'/posts/{self.post.pk}/', message.body)
+        self.assertEqual(result['events'], 4)
+        self.assertEqual(result['messages'], 1)
+        self.assertFalse(
+            Notification.objects.filter(sent__isnull=True).exists()
+        )
+        notifications.send_digests()
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_batches_keep_recipient_together(self):
+        """Пачка не разрывает события одного получателя"""
+        for actor in (self.reader, self.silent):
+            notifications.record(self.author.pk, actor.pk,
+                                 Notification.FOLLOW)
+            notifications.record(self.reader.pk, actor.pk,
+                                 Notification.FOLLOW)
+        result = notifications.send_digests(batch_size=3)
+        self.assertEqual(result['messages'], 2)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_command_reports_throughput(self):
+        """send_notifications печатает пропускную способность"""
+        self.comment(self.client, self.post)
+        out = StringIO()
+        call_command('send_notifications', stdout=out)
+        self.assertIn('писем 1', out.getvalue())
+        self.assertIn('писем/с', out.getvalue())
+        self.assertEqual(len(mail.outbox), 1)
+
+
+@override_settings(JOBS_EAGER=True)
+class EagerNotificationTests(TestCase):
+    def test_eager_mode_keeps_digest_delayed(self):
+        """Даже в синхронном режиме письма не шлются из запроса"""
+        author = User.objects.create_user(
+            username='auth', email='auth@example.com'
+        )
+        reader = User.objects.create_user(username='reader')
+        post = Post.objects.create(author=author, text='Пост')
+        client = Client()
+        client.force_login(reader)
+        for _ in range(3):
+            client.post(
+                reverse('posts:add_comment', args=[post.pk]), {'text': 'Ого'}
+            )
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(
+            Job.objects.filter(
+                key=notifications.DIGEST_KEY, status=Job.QUEUED
+            ).count(),
+            1,
+        )
+        call_command('send_notifications', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
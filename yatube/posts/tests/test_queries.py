@@ -0,0 +1,155 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core.middleware import QueryBudgetExceeded
+from core.queries import QueryCounter
+
+from .. import thumbnails
+from ..models import Comment, Follow, Group, Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+def make_image(color):
+    buffer = BytesIO()
+    Image.new('RGB', (40, 20), color).save(buffer, 'PNG')
+    return SimpleUploadedFile('pic.png', buffer.getvalue(), 'image/png')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class QueryCountTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+        cache.clear()
+
+    def count_queries(self, url):
+        cache.clear()
+        with QueryCounter() as counter:
+            self.client.get(url)
+        return counter.count
+
+    def test_post_detail_comments_do_not_add_queries(self):
+        """Число запросов post_detail не зависит от числа комментариев"""
+        url = reverse('posts:post_detail', args=(self.post.id,))
+        Comment.objects.create(post=self.post, author=self.user, text='1')
+        before = self.count_queries(url)
+        for number in range(10):
+            author = User.objects.create_user(username=f'commenter{number}')
+            Comment.objects.create(post=self.post, author=author, text='2')
+        self.assertEqual(self.count_queries(url), before)
+
+    def test_follow_index_authors_do_not_add_queries(self):
+        """Число запросов ленты подписок не зависит от числа авторов"""
+        url = reverse('posts:follow_index')
+        author = User.objects.create_user(username='author0')
+        Follow.objects.create(user=self.user, author=author)
+        Post.objects.create(author=author, text='Пост', group=self.group)
+        before = self.count_queries(url)
+        for number in range(1, 8):
+            author = User.objects.create_user(username=f'author{number}')
+            Follow.objects.create(user=self.user, author=author)
+            Post.objects.create(author=author, text='Пост', group=self.group)
+        self.assertEqual(self.count_queries(url), before)
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_feeds_fit_budgets(self):
+        """Ленты и страница поста укладываются в бюджеты запросов"""
+        author = User.objects.create_user(username='author')
+        Follow.objects.create(user=self.user, author=author)
+        # Картинки с миниатюрами и без них, и пост с комментариями
+        # разных авторов: всё это ленты и страница поста должны читать
+        # фиксированным числом запросов.
+        for number, color in enumerate(('red', 'green', 'blue', 'white')):
+            post = Post.objects.create(
+                author=author, text=f'Пост {number}', group=self.group,
+                image=make_image(color),
+            )
+            if number % 2:
+                thumbnails.generate(post.image.name)
+        for number in range(15):
+            Comment.objects.create(
+                post=post,
+                author=User.objects.create_user(username=f'commenter{number}'),
+                text=f'Комментарий {number}',
+            )
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:post_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(author.username,)),
+            reverse('posts:post_detail', args=(post.id,)),
+            reverse('posts:post_detail', args=(self.post.id,)),
+            reverse('posts:follow_index'),
+            reverse('posts:search') + '?q=пост',
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    @override_settings(
+        QUERY_BUDGETS={'posts:index': 1}, QUERY_BUDGET_STRICT=True
+    )
+    def test_strict_budget_fails_request(self):
+        """Строгий режим роняет запрос сверх бюджета"""
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('posts:index'))
+
+    @override_settings(
+        QUERY_BUDGETS={'posts:index': 1}, QUERY_BUDGET_STRICT=False
+    )
+    def test_soft_budget_logs_warning(self):
+        """Мягкий режим только пишет предупреждение в лог"""
+        with self.assertLogs('core.middleware', 'WARNING'):
+            response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
+
+
+class ExplainFeedsTests(TestCase):
+    def test_feeds_use_indexes(self):
+        """Ленты автора и группы читаются по составным индексам"""
+        author = User.objects.create_user(username='auth')
+        group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        Post.objects.create(author=author, text='Тестовый пост', group=group)
+        out = StringIO()
+        call_command('explain_feeds', stdout=out)
+        plans = out.getvalue()
+        self.assertIn('posts_post_pub_dat_d3c0cd_idx', plans)
+        self.assertIn('posts_post_author__075f1d_idx', plans)
+        self.assertIn('posts_post_group_i_6a7ae9_idx', plans)
@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import search
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='test-slug', description='Описание'
+        )
+        cls.cat = Post.objects.create(
+            author=cls.user, text='Кошка сидит на окне', group=cls.group
+        )
+        cls.dog = Post.objects.create(author=cls.other, text='Собака и кошка')
+        Post.objects.create(author=cls.user, text='Просто текст')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def found(self, **params):
+        response = self.client.get(reverse('posts:search'), params)
+        return {post.pk for post in response.context['posts']}
+
+    def test_search_finds_posts(self):
+        """Поиск находит посты по слову в любом регистре"""
+        self.assertEqual(self.found(q='КОШКА'), {self.cat.pk, self.dog.pk})
+        self.assertEqual(self.found(q='собака'), {self.dog.pk})
+        self.assertEqual(self.found(q='жираф'), set())
+
+    def test_search_filters(self):
+        """Результаты сужаются по группе и автору"""
+        self.assertEqual(
+            self.found(q='кошка', group=self.group.slug), {self.cat.pk}
+        )
+        self.assertEqual(
+            self.found(q='кошка', author=self.other.username), {self.dog.pk}
+        )
+
+    def test_operators_are_escaped(self):
+        """Спецсимволы запроса не ломают поиск"""
+        self.assertEqual(self.found(q='кошка" OR (*'), set())
+        self.assertEqual(self.found(q='"кошка"'), {self.cat.pk, self.dog.pk})
+
+    def test_index_follows_edits(self):
+        """Индекс обновляется при правке и удалении поста"""
+        cat = Post.objects.get(pk=self.cat.pk)
+        cat.text = 'Теперь тут жираф'
+        cat.save()
+        self.assertEqual(self.found(q='жираф'), {self.cat.pk})
+        self.assertEqual(self.found(q='кошка'), {self.dog.pk})
+        Post.objects.get(pk=self.dog.pk).delete()
+        self.assertEqual(self.found(q='кошка'), set())
+
+    @override_settings(POST_PER_PAGE=1)
+    def test_cursor_pagination(self):
+        """Курсор ведёт по всем совпадениям без повторов"""
+        response = self.client.get(reverse('posts:search'), {'q': 'кошка'})
+        first = response.context['posts']
+        cursor = response.context['next_cursor']
+        self.assertIsNotNone(cursor)
+        response = self.client.get(
+            reverse('posts:search'), {'q': 'кошка', 'cursor': cursor}
+        )
+        second = response.context['posts']
+        self.assertIsNone(response.context['next_cursor'])
+        self.assertEqual(
+            {post.pk for post in first + second}, {self.cat.pk, self.dog.pk}
+        )
+
+    def test_rebuild(self):
+        """Пересборка индекса подхватывает посты из bulk_create"""
+        Post.objects.bulk_create([Post(author=self.user, text='Жираф')])
+        self.assertEqual(search.ranked_ids('жираф', 10), [])
+        search.rebuild()
+        self.assertEqual(len(search.ranked_ids('жираф', 10)), 1)
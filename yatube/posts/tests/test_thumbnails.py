@@ -0,0 +1,167 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default
+
+from core.models import Job
+
+from .. import thumbnails
+from ..cards import render_cards
+from ..models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+def make_image(name='pic.png', color='red'):
+    buffer = BytesIO()
+    Image.new('RGB', (40, 20), color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        default.kvstore.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    @override_settings(JOBS_EAGER=True)
+    def test_form_save_generates_thumbnail(self):
+        """Сохранение формы с картинкой сразу готовит миниатюру"""
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост с картинкой', 'image': make_image(),
+        })
+        post = Post.objects.get()
+        self.assertIsNotNone(thumbnails.ready_thumbnail(post.image, 'card'))
+
+    def test_warm_thumbnails(self):
+        """Команда догенерирует недостающие миниатюры"""
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=make_image()
+        )
+        out = StringIO()
+        call_command('warm_thumbnails', workers=0, stdout=out)
+        self.assertIn('Готово: 1', out.getvalue())
+        self.assertIsNotNone(thumbnails.ready_thumbnail(post.image, 'card'))
+
+    def render_picture(self, post):
+        return Template(
+            '{% load post_images %}{% post_picture post.image sizes="50vw" %}'
+        ).render(Context({'post': post}))
+
+    def test_variants_cover_widths_and_formats(self):
+        """Варианты есть для каждой ширины, JPEG 960 - прежняя миниатюра"""
+        with mock.patch.object(
+            thumbnails, 'modern_formats', return_value=[
+                ('WEBP', 'image/webp', 80),
+            ]
+        ):
+            variants = thumbnails.variants('card')
+        self.assertEqual(
+            [(v.format, v.width, v.geometry) for v in variants],
+            [('WEBP', 320, '320x113'), ('WEBP', 640, '640x226'),
+             ('WEBP', 960, '960x339'), ('JPEG', 320, '320x113'),
+             ('JPEG', 640, '640x226'), ('JPEG', 960, '960x339')],
+        )
+        geometry, options = thumbnails.PRESETS['card']
+        self.assertEqual(
+            (variants[-1].geometry, variants[-1].options),
+            (geometry, dict(options, format='JPEG')),
+        )
+
+    @override_settings(THUMBNAIL_MODERN_FORMATS=['PNG'])
+    def test_picture_markup(self):
+        """<picture> перечисляет форматы в <source> и ширины в srcset"""
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=make_image()
+        )
+        # PNG стоит здесь вместо AVIF и WebP: его умеет любая сборка Pillow.
+        with mock.patch.object(
+            thumbnails, 'MODERN_FORMATS', (('PNG', 'image/png', 80),)
+        ):
+            thumbnails.generate(post.image.name)
+            html = self.render_picture(post)
+            self.assertTrue(thumbnails.is_ready(post.image, 'card'))
+        self.assertIn('<source type="image/png" srcset="', html)
+        self.assertIn('320w', html)
+        self.assertIn('sizes="50vw"', html)
+        self.assertIn(
+            f'src="{thumbnails.ready_thumbnail(post.image, "card").url}"',
+            html,
+        )
+
+    def test_picture_without_variants(self):
+        """Без готовых вариантов <picture> отдаёт оригинал и ничего не
+        пишет: ни миниатюр, ни задач"""
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=make_image()
+        )
+        with self.assertNumQueries(1):
+            html = self.render_picture(post)
+        self.assertIn(f'src="{post.image.url}"', html)
+        self.assertNotIn('srcset', html)
+        self.assertIsNone(thumbnails.ready_thumbnail(post.image, 'card'))
+        self.assertFalse(Job.objects.exists())
+        with self.assertNumQueries(0):
+            self.render_picture(post)
+        thumbnails.generate(post.image.name)
+        self.assertIn('320w', self.render_picture(post))
+
+    @override_settings(THUMBNAIL_PLACEHOLDER='img/placeholder.png')
+    def test_picture_placeholder(self):
+        """Вместо оригинала можно отдавать заглушку"""
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=make_image()
+        )
+        html = self.render_picture(post)
+        self.assertIn(
+            f'src="{settings.STATIC_URL}img/placeholder.png"', html
+        )
+
+    def test_page_reads_variants_in_one_query(self):
+        """Миниатюры всех карточек страницы читаются одним запросом"""
+        for color in ('red', 'green', 'blue'):
+            post = Post.objects.create(
+                author=self.user, text=color, image=make_image(color=color),
+            )
+            thumbnails.generate(post.image.name)
+        posts = list(Post.objects.with_related())
+        cache.clear()
+        with self.assertNumQueries(1):
+            cards = render_cards(posts)
+        self.assertEqual(sum('320w' in card for card in cards), 3)
+        with self.assertNumQueries(0):
+            render_cards(posts)
+
+    def test_bench_images(self):
+        """Отчёт показывает экономию байтов на страницах с картинками"""
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=make_image()
+        )
+        thumbnails.generate(post.image.name)
+        out = StringIO()
+        call_command('bench_images', '--width', '160', '--dpr', '1',
+                     stdout=out)
+        self.assertIn('index', out.getvalue())
+        self.assertIn('post_detail', out.getvalue())
+        self.assertNotIn('экономия   0.0%', out.getvalue().splitlines()[1])
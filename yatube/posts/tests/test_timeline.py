@@ -0,0 +1,140 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry
+from ..timeline import fan_out
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.old_post = Post.objects.create(
+            author=cls.author,
+            text='Пост до подписки',
+        )
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def feed(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_timeline(self):
+        """Подписка добавляет в ленту старые посты автора"""
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user, post=self.old_post
+        ).exists())
+        self.assertEqual(self.feed(), [self.old_post])
+
+    def test_new_post_fans_out(self):
+        """Новый пост попадает в ленты подписчиков"""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(self.feed(), [post, self.old_post])
+
+    def test_unfollow_trims_timeline(self):
+        """Отписка убирает посты автора из ленты"""
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.filter(user=self.user, author=self.author).delete()
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+        self.assertEqual(self.feed(), [])
+
+    @override_settings(TIMELINE_LENGTH=2)
+    def test_timeline_length(self):
+        """Лента обрезается до заданной длины"""
+        Post.objects.create(author=self.author, text='Второй пост')
+        Post.objects.create(author=self.author, text='Третий пост')
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.user).count(), 2
+        )
+
+    @override_settings(TIMELINE_CELEBRITY_FOLLOWERS=1)
+    def test_celebrity_posts_pulled_on_read(self):
+        """Посты популярных авторов не рассылаются, а читаются из таблицы"""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост звезды')
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [post, self.old_post])
+
+    def test_rebuild_timelines(self):
+        """Команда пересобирает ленты по существующим подпискам"""
+        Follow.objects.create(user=self.user, author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.feed(), [self.old_post])
+
+    @override_settings(TIMELINE_LENGTH=20)
+    def test_fan_out_trims_timeline(self):
+        """Рассылка обрезает ленту, когда она переросла длину с запасом"""
+        Follow.objects.create(user=self.user, author=self.author)
+        for number in range(21):
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.user).count(), 22
+        )
+        Post.objects.create(author=self.author, text='Последний пост')
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.user).count(), 20
+        )
+
+    @override_settings(TIMELINE_LENGTH=20)
+    def test_fan_out_checks_overflow_in_one_query(self):
+        """Проверка переполнения лент не зависит от числа подписчиков"""
+        for number in range(5):
+            Follow.objects.create(
+                user=User.objects.create_user(username=f'follower{number}'),
+                author=self.author,
+            )
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        with CaptureQueriesContext(connection) as queries:
+            fan_out(post)
+        self.assertEqual(len(queries), 4)
+
+    @override_settings(TIMELINE_CELEBRITY_FOLLOWERS=2)
+    def test_crossing_celebrity_threshold(self):
+        """Переход через порог знаменитости пересобирает записи автора"""
+        Follow.objects.create(user=self.user, author=self.author)
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=other, author=self.author)
+        self.assertFalse(
+            TimelineEntry.objects.filter(author=self.author).exists()
+        )
+        post = Post.objects.create(author=self.author, text='Пост звезды')
+        Follow.objects.filter(user=other).delete()
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(user=self.user).values_list(
+                'post_id', flat=True
+            )),
+            {post.pk, self.old_post.pk},
+        )
+        self.assertEqual(self.feed(), [post, self.old_post])
+
+    def test_feed_reads_timeline_entries(self):
+        """Без знаменитостей страница читается из записей ленты"""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.feed(), [post, self.old_post])
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('COUNT("posts_follow"', sql)
+        page = [
+            query['sql'] for query in queries
+            if 'FROM "posts_timelineentry"' in query['sql']
+            and 'ORDER BY' in query['sql']
+        ]
+        self.assertTrue(page)
@@ -1,11 +1,11 @@
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django import forms
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.core.cache import cache
 
-from ..models import Post, Group, Follow
+from ..models import Comment, Post, Group, Follow
 
 
 User = get_user_model()
@@ -139,6 +139,45 @@ class PostViewsTest(TestCase):
                     6
                 )
 
+    @override_settings(POST_NUMBERED_PAGES=1)
+    def test_cursor_paginator(self):
+        """Проверка курсорных страниц после нумерованных"""
+        Post.objects.bulk_create(
+            Post(author=PostViewsTest.author, text=f'Тестовый пост {item}')
+            for item in range(15)
+        )
+        response_page_1 = self.authorized_client.get(reverse('posts:index'))
+        page_1 = response_page_1.context['page_obj']
+        self.assertTrue(page_1.paginator.truncated)
+        self.assertEqual(page_1.paginator.count, 10)
+        self.assertIsNotNone(page_1.next_cursor)
+
+        response_page_2 = self.authorized_client.get(
+            reverse('posts:index') + f'?cursor={page_1.next_cursor}'
+        )
+        page_2 = response_page_2.context['page_obj']
+        self.assertEqual(len(page_2), 6)
+        self.assertIsNone(page_2.next_cursor)
+        self.assertFalse(
+            set(page_1.object_list) & set(page_2.object_list)
+        )
+
+        response_back = self.authorized_client.get(
+            reverse('posts:index') + f'?cursor={page_2.previous_cursor}'
+        )
+        self.assertEqual(
+            list(response_back.context['page_obj']), list(page_1)
+        )
+
+    def test_cursor_paginator_bad_cursor(self):
+        """Испорченный курсор отдаёт первую страницу"""
+        response = self.authorized_client.get(
+            reverse('posts:index') + '?cursor=garbage'
+        )
+        self.assertEqual(
+            response.context['page_obj'][0], PostViewsTest.post
+        )
+
     def test_group_list_show_correct_context(self):
         """Проверка контекста страниц групп"""
         response = self.authorized_client.\
@@ -227,6 +266,26 @@ class PostViewsTest(TestCase):
         cache.clear()
         self.assertNotEqual(self.post.text.encode(), responce.content)
 
+    def test_index_cache_invalidated_by_post(self):
+        """Новый пост сразу виден на закешированной главной странице"""
+        self.authorized_client.get(reverse('posts:index'))
+        cached = self.authorized_client.get(reverse('posts:index'))
+        self.assertIsNone(cached.context)
+        Post.objects.create(author=self.author, text='Свежий пост')
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Свежий пост')
+
+    def test_post_detail_not_modified(self):
+        """Страница поста отвечает 304, пока к посту не добавили комментарий"""
+        url = reverse('posts:post_detail', args=(self.post.id,))
+        etag = self.authorized_client.get(url)['ETag']
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Comment.objects.create(post=self.post, author=self.user, text='Новый')
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Новый')
+
     def test_authors_follow(self):
         """Проверка подписки на авторов"""
         self.authorized_client.get(
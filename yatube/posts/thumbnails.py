@@ -0,0 +1,169 @@
+from collections import namedtuple
+
+from django.conf import settings
+from PIL import Image
+from sorl.thumbnail import base as sorl_base
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.models import KVStore
+
+from core import jobs
+
+from .models import Post
+
+PRESETS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+
+# Современные форматы по убыванию предпочтения: формат Pillow, MIME-тип
+# для <source> и качество сжатия.
+MODERN_FORMATS = (
+    ('AVIF', 'image/avif', 60),
+    ('WEBP', 'image/webp', 80),
+)
+
+# sorl не знает расширения AVIF, хотя сохраняет любой формат Pillow.
+sorl_base.EXTENSIONS.setdefault('AVIF', 'avif')
+
+Variant = namedtuple('Variant', 'format mime width geometry options')
+
+
+def modern_formats():
+    """Современные форматы из THUMBNAIL_MODERN_FORMATS, которые умеет
+    сохранять установленный Pillow."""
+    Image.init()
+    return [
+        (format_, mime, quality)
+        for format_, mime, quality in MODERN_FORMATS
+        if format_ in settings.THUMBNAIL_MODERN_FORMATS
+        and format_ in Image.SAVE
+    ]
+
+
+def variants(preset):
+    """Все варианты пресета: каждая ширина из THUMBNAIL_WIDTHS в каждом
+    доступном формате. JPEG полной ширины совпадает с прежней
+    миниатюрой пресета."""
+    geometry, options = PRESETS[preset]
+    width, height = (int(side) for side in geometry.split('x'))
+    widths = sorted({
+        size for size in settings.THUMBNAIL_WIDTHS if size < width
+    } | {width})
+    formats = [*modern_formats(), ('JPEG', 'image/jpeg', None)]
+    result = []
+    for format_, mime, quality in formats:
+        variant_options = dict(options, format=format_)
+        if quality:
+            variant_options['quality'] = quality
+        for size in widths:
+            result.append(Variant(
+                format_, mime, size,
+                f'{size}x{round(height * size / width)}',
+                variant_options,
+            ))
+    return result
+
+
+def _source(image):
+    # Ключ sorl зависит от хранилища, поэтому имя из базы и FieldFile
+    # должны давать одно и то же хранилище картинок постов.
+    return ImageFile(
+        getattr(image, 'name', image), Post._meta.get_field('image').storage
+    )
+
+
+def _thumbnail_file(image, geometry, options):
+    # Повторяет вычисление имени из ThumbnailBackend.get_thumbnail,
+    # но без чтения исходника и генерации.
+    backend = default.backend
+    source = _source(image)
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return ImageFile(name, default.storage)
+
+
+def ready_thumbnail(image, preset):
+    """Готовая миниатюра из хранилища sorl или None, если её ещё нет."""
+    geometry, options = PRESETS[preset]
+    return default.kvstore.get(_thumbnail_file(image, geometry, options))
+
+
+def ready_many(images, preset):
+    """{имя картинки: [(вариант, готовая миниатюра или None), ...]}.
+
+    Повторяет чтение хранилища sorl с кешем перед базой, но для всех
+    вариантов всех картинок страницы сразу: один get_many и один запрос
+    за промахами вместо запроса на каждый вариант. Промахи, как и в
+    sorl, тоже кешируются, а generate перезаписывает их готовыми.
+    """
+    kvstore = default.kvstore
+    keys = {}
+    for image in images:
+        keys[getattr(image, 'name', image)] = [
+            (variant, add_prefix(_thumbnail_file(
+                image, variant.geometry, variant.options
+            ).key, 'image'))
+            for variant in variants(preset)
+        ]
+    wanted = {key for pairs in keys.values() for _, key in pairs}
+    values = kvstore.cache.get_many(wanted) if wanted else {}
+    missing = wanted - values.keys()
+    if missing:
+        found = dict(
+            KVStore.objects.filter(key__in=missing).values_list('key', 'value')
+        )
+        fetched = {key: found.get(key, EMPTY_VALUE) for key in missing}
+        kvstore.cache.set_many(fetched, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(fetched)
+    return {
+        name: [
+            (variant, None if values[key] == EMPTY_VALUE
+             else deserialize_image_file(values[key]))
+            for variant, key in pairs
+        ]
+        for name, pairs in keys.items()
+    }
+
+
+def ready_variants(image, preset):
+    """Пары (вариант, готовая миниатюра или None) для всех вариантов."""
+    return ready_many([image], preset)[getattr(image, 'name', image)]
+
+
+def all_ready(ready):
+    return all(thumbnail is not None for _, thumbnail in ready)
+
+
+def is_ready(image, preset):
+    return all_ready(ready_variants(image, preset))
+
+
+def delete(image):
+    """Удаляет миниатюры картинки и её запись в хранилище sorl."""
+    default.kvstore.delete(_source(image))
+
+
+@jobs.task
+def generate(name):
+    source = _source(name)
+    for preset in PRESETS:
+        for variant in variants(preset):
+            get_thumbnail(source, variant.geometry, **variant.options)
+    return name
+
+
+def schedule(name):
+    """Ставит генерацию миниатюр в очередь фоновых задач."""
+    jobs.enqueue(generate, name, key=f'thumbnails:{name}')
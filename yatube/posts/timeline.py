@@ -0,0 +1,187 @@
+from django.conf import settings
+from django.db.models import OuterRef, Q, Subquery
+
+from core import jobs
+
+from .follows import following_ids
+from .models import Follow, Post, TimelineEntry, UserStats
+from .utils import FEED_ORDERING
+
+TIMELINE_ORDERING = ('-pub_date', '-post_id')
+
+
+def celebrity_ids(author_ids):
+    """Авторы, чьи посты подтягиваются при чтении, а не рассылаются."""
+    return set(
+        UserStats.objects.filter(
+            user_id__in=author_ids,
+            followers_count__gte=settings.TIMELINE_CELEBRITY_FOLLOWERS,
+        ).values_list('user_id', flat=True)
+    )
+
+
+def fan_out(post):
+    if celebrity_ids([post.author_id]):
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True).distinct()
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post=post,
+                author_id=post.author_id,
+                pub_date=post.pub_date,
+            )
+            for user_id in follower_ids.iterator()
+        ),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    # С запасом в десятую часть длины ленты обрезка нужна редко: одним
+    # запросом находим подписчиков, чья лента переросла запас, и обрезаем
+    # только их.
+    overflow = settings.TIMELINE_LENGTH + settings.TIMELINE_LENGTH // 10
+    overflowing = Follow.objects.filter(author_id=post.author_id).annotate(
+        overflow=Subquery(
+            TimelineEntry.objects.filter(user_id=OuterRef('user_id'))
+            .order_by(*TIMELINE_ORDERING)
+            .values('pk')[overflow:overflow + 1]
+        ),
+    ).filter(overflow__isnull=False).values_list('user_id', flat=True)
+    for user_id in overflowing:
+        trim(user_id)
+
+
+@jobs.task
+def fan_out_post(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        fan_out(post)
+
+
+def backfill(user_id, author_id):
+    if celebrity_ids([author_id]):
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )[:settings.TIMELINE_LENGTH]
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for post_id, pub_date in posts
+        ),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim(user_id)
+
+
+def rebuild(user_id, celebrities=None):
+    """Собирает ленту пользователя заново одной выборкой."""
+    followed = Follow.objects.filter(user_id=user_id).values_list(
+        'author_id', flat=True
+    )
+    if celebrities is None:
+        celebrities = celebrity_ids(followed)
+    posts = Post.objects.filter(author_id__in=followed).exclude(
+        author_id__in=celebrities
+    ).values_list('pk', 'author_id', 'pub_date')[:settings.TIMELINE_LENGTH]
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for post_id, author_id, pub_date in posts
+        ),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+    )
+
+
+def trim(user_id, author_id=None):
+    """Убирает посты автора из ленты или обрезает ленту до её длины."""
+    entries = TimelineEntry.objects.filter(user_id=user_id)
+    if author_id is not None:
+        entries.filter(author_id=author_id).delete()
+        return
+    oldest_kept = entries.order_by(*TIMELINE_ORDERING).values_list(
+        'pub_date', flat=True
+    )[settings.TIMELINE_LENGTH - 1:settings.TIMELINE_LENGTH].first()
+    if oldest_kept is not None:
+        entries.filter(pub_date__lt=oldest_kept).delete()
+
+
+def followers_changed(author_id, delta):
+    """Ставит пересборку записей автора, если подписка или отписка
+    перевела его через порог знаменитости."""
+    threshold = settings.TIMELINE_CELEBRITY_FOLLOWERS
+    followers_count = UserStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True
+    ).first() or 0
+    if (followers_count - delta < threshold) != (followers_count < threshold):
+        jobs.enqueue(
+            refresh_author, author_id, key=f'timeline_author:{author_id}'
+        )
+
+
+@jobs.task
+def refresh_author(author_id):
+    """Приводит записи лент к тому, знаменитость автор или нет.
+
+    Посты знаменитости читаются из таблицы постов, и её записи в лентах
+    больше не нужны; бывшей знаменитости записи нужно разослать заново.
+    """
+    if celebrity_ids([author_id]):
+        TimelineEntry.objects.filter(author_id=author_id).delete()
+        return
+    followers = Follow.objects.filter(author_id=author_id).values_list(
+        'user_id', flat=True
+    )
+    for user_id in followers.iterator():
+        backfill(user_id, author_id)
+
+
+def timeline_posts(user):
+    followed = following_ids(user.pk)
+    return Post.objects.filter(
+        Q(pk__in=TimelineEntry.objects.filter(user=user).values('post_id'))
+        | Q(author_id__in=celebrity_ids(followed) if followed else ())
+    )
+
+
+def timeline_feed(user):
+    """Запрос ленты подписок и порядок для паджинатора.
+
+    Пока среди подписок нет знаменитостей, страница читается из записей
+    ленты по индексу (user, -pub_date, -post) без сортировки, а посты
+    подгружаются потом через ``with_posts``. Посты знаменитостей в
+    записях не хранятся, с ними лента собирается из постов.
+    """
+    followed = following_ids(user.pk)
+    if followed and celebrity_ids(followed):
+        return timeline_posts(user).with_related(), FEED_ORDERING
+    return TimelineEntry.objects.filter(user_id=user.pk), TIMELINE_ORDERING
+
+
+def with_posts(page):
+    """Заменяет записи ленты на странице их постами."""
+    entries = page.object_list
+    if entries and isinstance(entries[0], TimelineEntry):
+        posts = Post.objects.with_related().in_bulk(
+            [entry.post_id for entry in entries]
+        )
+        page.object_list = [
+            posts[entry.post_id] for entry in entries
+            if entry.post_id in posts
+        ]
+    return page
@@ -1,10 +1,163 @@
+import base64
+import json
+
+from django.conf import settings
 from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+FEED_ORDERING = ('-pub_date', '-pk')
+COMMENT_ORDERINGS = {
+    'oldest': ('created', 'pk'),
+    'newest': ('-created', '-pk'),
+}
+
+
+def _dump(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+class CursorPaginator(Paginator):
+    """Паджинатор с курсорными страницами после нумерованных.
+
+    Первые ``numbered_pages`` страниц отдаются через LIMIT/OFFSET, а их
+    количество считается только в пределах этого окна. Всё, что глубже,
+    доступно по непрозрачным курсорам из значений ``ordering``: любая
+    страница стоит одного прохода по диапазону индекса.
+    """
+
+    def __init__(self, object_list, per_page, ordering=FEED_ORDERING,
+                 numbered_pages=None, **kwargs):
+        super().__init__(object_list.order_by(*ordering), per_page, **kwargs)
+        self.ordering = ordering
+        self.numbered_pages = numbered_pages
+
+    @cached_property
+    def _bounded_count(self):
+        if self.numbered_pages is None:
+            return super().count, False
+        limit = self.numbered_pages * self.per_page
+        counted = self.object_list[:limit + 1].count()
+        return min(counted, limit), counted > limit
+
+    @property
+    def count(self):
+        return self._bounded_count[0]
+
+    @property
+    def truncated(self):
+        """Есть ли записи глубже последней нумерованной страницы."""
+        return self._bounded_count[1]
+
+    def encode_cursor(self, obj, backwards=False):
+        values = [_dump(getattr(obj, field.lstrip('-')))
+                  for field in self.ordering]
+        raw = json.dumps([values, backwards], separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        padded = cursor + '=' * (-len(cursor) % 4)
+        try:
+            values, backwards = json.loads(base64.urlsafe_b64decode(padded))
+            opts = self.object_list.model._meta
+            fields = [
+                opts.pk if name == 'pk' else opts.get_field(name)
+                for name in (field.lstrip('-') for field in self.ordering)
+            ]
+            values = [
+                field.to_python(value) for field, value in zip(fields, values)
+            ]
+        except Exception:
+            return None
+        if len(values) != len(self.ordering):
+            return None
+        return values, bool(backwards)
+
+    def _keyset(self, values, backwards):
+        condition = Q()
+        for position, field in enumerate(self.ordering):
+            descending = field.startswith('-') != backwards
+            equal = {
+                name.lstrip('-'): value
+                for name, value in zip(self.ordering, values[:position])
+            }
+            lookup = '{}__{}'.format(
+                field.lstrip('-'), 'lt' if descending else 'gt'
+            )
+            condition |= Q(**equal, **{lookup: values[position]})
+        # Нестрогая граница по первому полю дублирует условие, но позволяет
+        # базе начать чтение индекса сразу с нужного места.
+        first = self.ordering[0]
+        bound = '{}__{}'.format(
+            first.lstrip('-'),
+            'lte' if first.startswith('-') != backwards else 'gte',
+        )
+        return Q(**{bound: values[0]}) & condition
+
+    def keyset_queryset(self, values, backwards=False):
+        """Запрос страницы, начинающейся сразу за ключом ``values``."""
+        queryset = self.object_list.filter(self._keyset(values, backwards))
+        if backwards:
+            queryset = queryset.reverse()
+        return queryset[:self.per_page + 1]
+
+    def page(self, number):
+        page = super().page(number)
+        page.object_list = list(page.object_list)
+        page.cursor = None
+        page.previous_cursor = None
+        page.next_cursor = None
+        if not page.has_next() and self.truncated and page.object_list:
+            page.next_cursor = self.encode_cursor(page.object_list[-1])
+        return page
+
+    def cursor_page(self, cursor):
+        decoded = self.decode_cursor(cursor)
+        if decoded is None:
+            return self.get_page(1)
+        values, backwards = decoded
+        rows = list(self.keyset_queryset(values, backwards))
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+        page = self._get_page(rows, None, self)
+        page.cursor = cursor
+        page.previous_cursor = None
+        page.next_cursor = None
+        if rows and (has_more or not backwards):
+            page.previous_cursor = self.encode_cursor(rows[0], True)
+        if rows and (has_more or backwards):
+            page.next_cursor = self.encode_cursor(rows[-1])
+        return page
+
 
-from yatube.settings import POST_PER_PAGE
+def get_Paginator(post_list, request, ordering=FEED_ORDERING):
+    paginator = CursorPaginator(
+        post_list,
+        settings.POST_PER_PAGE,
+        ordering=ordering,
+        numbered_pages=settings.POST_NUMBERED_PAGES,
+    )
+    cursor = request.GET.get('cursor')
+    if cursor:
+        return paginator.cursor_page(cursor)
+    return paginator.get_page(request.GET.get('page'))
 
 
-def get_Paginator(post_list, request):
-    paginator = Paginator(post_list, POST_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+def get_comments_page(comments, request):
+    order = request.GET.get('order')
+    if order not in COMMENT_ORDERINGS:
+        order = 'oldest'
+    paginator = CursorPaginator(
+        comments,
+        settings.COMMENTS_PER_PAGE,
+        ordering=COMMENT_ORDERINGS[order],
+        numbered_pages=1,
+    )
+    cursor = request.GET.get('cursor')
+    page = paginator.cursor_page(cursor) if cursor else paginator.page(1)
+    page.order = order
+    return page
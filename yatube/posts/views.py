@@ -1,24 +1,47 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.http import (
+    HttpResponseBadRequest, JsonResponse, StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.utils.dateparse import parse_datetime
 
+from core.cache import cache_page_versioned, etag_versioned
+from core.replicas import read_from_replica
+
+from . import counters, export, search
+from .follows import following_ids
 from .forms import PostForm, CommentForm
-from .models import Group, Post, User, Follow
-from .utils import get_Paginator
+from .models import Group, Post, User, Follow, UserStats
+from .timeline import timeline_feed, with_posts
+from .utils import get_comments_page, get_Paginator
+
 
+def author_stats(author):
+    """Счётчики, выбранные вместе с автором, или созданные заново."""
+    try:
+        return author.stats
+    except UserStats.DoesNotExist:
+        return counters.stats_for(author.pk)
 
-@cache_page(20, key_prefix='index_page')
+
+@read_from_replica
+@cache_page_versioned(lambda request: ['index'])
 def index(request):
-    post_list = Post.objects.select_related('group', 'author')
+    post_list = Post.objects.with_related()
     context = {
         'page_obj': get_Paginator(post_list, request),
     }
     return render(request, 'posts/index.html', context)
 
 
+@read_from_replica
+@cache_page_versioned(lambda request, slug: [f'group:{slug}'])
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.select_related('author')
+    post_list = group.posts.with_related()
     context = {
         'group': group,
         'page_obj': get_Paginator(post_list, request),
@@ -26,14 +49,19 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@read_from_replica
+@cache_page_versioned(lambda request, username: [f'profile:{username}'])
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.select_related('group')
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    post_list = author.posts.with_related()
     following = request.user.is_authenticated and\
-        request.user != author and Follow.objects.filter(
-            author=author, user=request.user).exists()
+        request.user != author and\
+        author.pk in following_ids(request.user.pk)
     context = {
         'author': author,
+        'stats': author_stats(author),
         'page_obj': get_Paginator(post_list, request),
         'following': following,
     }
@@ -41,19 +69,91 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+def post_detail_namespaces(request, post_id):
+    """Пространства имён, от которых зависит страница поста."""
+    namespaces = [f'post:{post_id}']
+    author, group = Post.objects.filter(pk=post_id).values_list(
+        'author__username', 'group__slug'
+    ).first() or (None, None)
+    if author:
+        namespaces.append(f'profile:{author}')
+    if group:
+        namespaces.append(f'group:{group}')
+    return namespaces
+
+
+@read_from_replica
+@etag_versioned(post_detail_namespaces)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.with_related().select_related('author__stats'),
+        pk=post_id,
+    )
+    comments = get_comments_page(post.comments.with_related(), request)
     form = CommentForm()
     context = {
         'post': post,
+        'stats': author_stats(post.author),
         'comments': comments,
         'form': form
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = get_comments_page(post.comments.with_related(), request)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created,
+                }
+                for comment in comments
+            ],
+            'next_cursor': comments.next_cursor,
+        })
+    context = {
+        'post': post,
+        'comments': comments,
+    }
+    return render(request, 'includes/comments.html', context)
+
+
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    group = author = None
+    if request.GET.get('group'):
+        group = get_object_or_404(Group, slug=request.GET['group'])
+    if request.GET.get('author'):
+        author = get_object_or_404(User, username=request.GET['author'])
+    posts, next_cursor = [], None
+    if query:
+        posts, next_cursor = search.search(
+            query,
+            settings.POST_PER_PAGE,
+            group_id=group and group.pk,
+            author_id=author and author.pk,
+            cursor=request.GET.get('cursor'),
+        )
+    params = request.GET.copy()
+    params.pop('cursor', None)
+    context = {
+        'query': query,
+        'group': group,
+        'author': author,
+        'posts': posts,
+        'next_cursor': next_cursor,
+        'params': params.urlencode(),
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
@@ -65,6 +165,7 @@ def post_create(request):
 
 
 @login_required
+@transaction.atomic
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     if post.author != request.user:
@@ -85,6 +186,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -97,15 +199,17 @@ def add_comment(request, post_id):
 
 
 @login_required
+@read_from_replica
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
+    feed, ordering = timeline_feed(request.user)
     context = {
-        'page_obj': get_Paginator(posts, request),
+        'page_obj': with_posts(get_Paginator(feed, request, ordering)),
     }
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author != request.user:
@@ -117,7 +221,45 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(author=author, user=request.user).delete()
     return redirect('posts:profile', username)
+
+
+@staff_member_required
+def export_content(request):
+    kinds = request.GET.getlist('type') or list(export.EXPORTS)
+    if any(kind not in export.EXPORTS for kind in kinds):
+        return HttpResponseBadRequest('Неизвестный тип выгрузки')
+    try:
+        since = parse_datetime(request.GET.get('since', '')) or None
+    except ValueError:
+        return HttpResponseBadRequest('Несуществующая дата в since')
+    if 'after_id' in request.GET and len(kinds) != 1:
+        return HttpResponseBadRequest(
+            'after_id задаётся для одной таблицы, для нескольких - '
+            'after_<тип>'
+        )
+    after_ids = {}
+    for kind in kinds:
+        value = request.GET.get(f'after_{kind}', request.GET.get('after_id'))
+        if value and value.isdigit():
+            after_ids[kind] = int(value)
+    if request.GET.get('format') == 'csv':
+        if len(kinds) != 1:
+            return HttpResponseBadRequest('CSV выгружается по одной таблице')
+        response = StreamingHttpResponse(
+            export.csv_lines(kinds[0], after_ids.get(kinds[0]), since),
+            content_type='text/csv; charset=utf-8',
+        )
+        filename = f'{kinds[0]}.csv'
+    else:
+        response = StreamingHttpResponse(
+            export.ndjson(kinds, after_ids, since),
+            content_type='application/x-ndjson; charset=utf-8',
+        )
+        filename = 'content.ndjson'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,22 @@
+from django.contrib.auth import BACKEND_SESSION_KEY
+
+LEGACY_BACKEND = 'django.contrib.auth.backends.ModelBackend'
+BACKEND = 'users.backends.CachedModelBackend'
+
+
+class LegacySessionMiddleware:
+    """Переводит сессии, открытые через ModelBackend, на CachedModelBackend.
+
+    Без этого после удаления ModelBackend из ``AUTHENTICATION_BACKENDS``
+    такие пользователи оказались бы разлогинены. Должен стоять между
+    SessionMiddleware и AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        session = request.session
+        if session.get(BACKEND_SESSION_KEY) == LEGACY_BACKEND:
+            session[BACKEND_SESSION_KEY] = BACKEND
+        return self.get_response(request)
@@ -1,4 +1,6 @@
 import os
+import sys
+import tempfile
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -29,10 +31,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
+    'users.middleware.LegacySessionMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -58,16 +64,45 @@ TEMPLATES = [
     },
 ]
 
+# Боевой профиль шаблонов: разобранные шаблоны живут в памяти воркера,
+# а wsgi.py загружает их все до первого запроса. Включается
+# TEMPLATE_PROFILE=production; при выкладке шаблоны проверяет
+# manage.py precompile_templates.
+TEMPLATE_WARM_UP = os.environ.get('TEMPLATE_PROFILE') == 'production'
+if TEMPLATE_WARM_UP:
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
 }
 
+# Профиль базы для боевого сервера: постоянные соединения и WAL, чтобы
+# читатели не ждали пишущих add_comment и post_create. Включается
+# DB_PROFILE=production, сравнение профилей - manage.py bench_db.
+SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 20000,
+}
+SQLITE_PRAGMAS = {}
+if os.environ.get('DB_PROFILE') == 'production':
+    DATABASES['default']['CONN_MAX_AGE'] = 600
+    DATABASES['default']['OPTIONS'] = {'transaction_mode': 'IMMEDIATE'}
+    SQLITE_PRAGMAS = SQLITE_PRODUCTION_PRAGMAS
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -100,18 +135,132 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
 POST_PER_PAGE = 10
+POST_NUMBERED_PAGES = 10
+COMMENTS_PER_PAGE = 20
+TIMELINE_LENGTH = 1000
+TIMELINE_CELEBRITY_FOLLOWERS = 10000
+TIMELINE_BATCH_SIZE = 200
 LOGIN_URL = 'users:login'
+AUTHENTICATION_BACKENDS = [
+    'users.backends.CachedModelBackend',
+]
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
 LOGIN_REDIRECT_URL = 'posts:index'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+DEFAULT_FROM_EMAIL = 'noreply@yatube.ru'
+SITE_URL = os.environ.get('SITE_URL', 'http://127.0.0.1:8000')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Сколько повторно загруженный файл защищён от удаления до коммита поста;
+# отметки старше остаются от откаченных транзакций.
+MEDIA_PIN_TIMEOUT = 60 * 10
+
+THUMBNAIL_PLACEHOLDER = None
+# Ширины вариантов для srcset. Современные форматы, которых не умеет
+# установленный Pillow, пропускаются: остаётся JPEG.
+THUMBNAIL_WIDTHS = [320, 640, 960]
+THUMBNAIL_MODERN_FORMATS = ['AVIF', 'WEBP']
+
+# Тесты не должны видеть страницы и версии, оставшиеся в общем кеше
+# от прошлых прогонов на другой базе.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
 
 CACHES = {
     'default': {
+        'BACKEND': 'core.cache_backends.TieredCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'LOCAL_PREFIXES': ['pagecache:page:', 'postcard:'],
+            'LOCAL_MAX_ENTRIES': 500,
+            'LOCAL_TIMEOUT': 60,
+        },
+    },
+    # Общий для всех воркеров кеш. На боевом сервере это memcached или
+    # redis через CACHE_BACKEND и CACHE_LOCATION. Файловый кеш по
+    # умолчанию - только для разработки: при каждом set он перечисляет
+    # свой каталог, поэтому записей в нём держится немного, а лежит он
+    # вне репозитория.
+    'shared': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache',
+        ),
+        'LOCATION': os.environ.get(
+            'CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'yatube-cache'),
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+}
+if TESTING:
+    CACHES['shared'] = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
+
+# Реплики для чтения лент, профилей и постов. Локально реплику изображает
+# копия базы, которую manage.py sync_replica обновляет с задержкой.
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+DATABASE_REPLICAS = []
+if os.environ.get('DB_REPLICA') == '1' and not TESTING:
+    DATABASES['replica'] = {
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+        'CONN_MAX_AGE': DATABASES['default'].get('CONN_MAX_AGE', 0),
+    }
+    DATABASE_REPLICAS = ['replica']
+REPLICA_PIN_COOKIE = 'pin_primary'
+REPLICA_PIN_SECONDS = 10
+REPLICA_MAX_LAG = 10
+
+# Страницы с картинками читают все миниатюры одним запросом к sorl.
+QUERY_BUDGETS = {
+    'posts:index': 6,
+    'posts:post_list': 6,
+    'posts:profile': 7,
+    'posts:post_detail': 7,
+    'posts:follow_index': 8,
+    'posts:post_comments': 5,
+    'posts:search': 6,
 }
+# В тестах бюджеты обязательны: превышение роняет запрос.
+QUERY_BUDGET_STRICT = os.environ.get(
+    'QUERY_BUDGET_STRICT', '1' if TESTING else '0'
+) == '1'
+
+PROFILING_ENABLED = os.environ.get('PROFILING') == '1'
+PROFILING_BUFFER_SIZE = 1000
+PROFILING_DUMP_DIR = os.path.join(BASE_DIR, 'perf')
+PROFILING_DUMP_EVERY = 100
+
+PAGE_CACHE_TIMEOUT = 60 * 60 * 6
+PAGE_CACHE_LOCK_TIMEOUT = 10
+PAGE_CACHE_LOCK_WAIT = 2
+
+POST_CARD_TIMEOUT = 60 * 60 * 24
+USER_CACHE_TIMEOUT = 60 * 60
+FOLLOWING_CACHE_TIMEOUT = 60 * 60
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Очередь фоновых задач core.jobs, воркеры - manage.py run_workers. При
+# JOBS_EAGER задачи выполняются сразу в запросе: так удобнее разработке
+# без запущенных воркеров и тестам. Отложенные задачи (дайджесты писем)
+# и тогда ждут в очереди run_workers или send_notifications.
+JOBS_EAGER = TESTING or os.environ.get(
+    'JOBS_EAGER', '1' if DEBUG else '0'
+) == '1'
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_DELAY = 5
+JOBS_MAX_RETRY_DELAY = 60 * 60
+JOBS_TIMEOUT = 60 * 10
+
+# События для писем копятся не дольше интервала и уходят одним дайджестом
+# на получателя.
+NOTIFICATION_DIGEST_INTERVAL = 60 * 15
+NOTIFICATION_BATCH_SIZE = 500
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
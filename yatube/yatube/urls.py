@@ -3,8 +3,11 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import perf_report
+
 
 urlpatterns = [
+    path('admin/perf/', perf_report, name='perf_report'),
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls', namespace='users')),
     path('', include('posts.urls', namespace='posts')),